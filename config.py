@@ -70,6 +70,8 @@ SPOTIFY_CLIENT_SECRET = getenv("SPOTIFY_CLIENT_SECRET", "907c6a054c214005aeae1fd
 # Maximum limit for fetching playlist's track from youtube, spotify, apple links.
 SERVER_PLAYLIST_LIMIT = int(getenv("SERVER_PLAYLIST_LIMIT", "50"))
 PLAYLIST_FETCH_LIMIT = int(getenv("PLAYLIST_FETCH_LIMIT", "25"))
+# Number of playlist entries looked up on youtube at the same time.
+PLAYLIST_RESOLVE_CONCURRENCY = int(getenv("PLAYLIST_RESOLVE_CONCURRENCY", "8"))
 
 SONG_DOWNLOAD_DURATION = int(getenv("SONG_DOWNLOAD_DURATION_LIMIT", "180"))
 SONG_DOWNLOAD_DURATION_LIMIT = int(getenv("SONG_DOWNLOAD_DURATION_LIMIT", "2000"))
@@ -79,13 +81,95 @@ TG_AUDIO_FILESIZE_LIMIT = int(getenv("TG_AUDIO_FILESIZE_LIMIT", 104857600))
 TG_VIDEO_FILESIZE_LIMIT = int(getenv("TG_VIDEO_FILESIZE_LIMIT", 2097152000))
 # Checkout https://www.gbmb.org/mb-to-bytes for converting mb to bytes
 
+# Disk budget (in MB) for downloaded tracks kept in the media cache, and the eviction policy ("lru" or "lfu").
+MEDIA_CACHE_SIZE = int(getenv("MEDIA_CACHE_SIZE", "2048"))
+MEDIA_CACHE_POLICY = getenv("MEDIA_CACHE_POLICY", "lru").lower()
+
+# How many upcoming queued tracks to download in the background while the current one plays (0 disables it).
+PREFETCH_DEPTH = int(getenv("PREFETCH_DEPTH", "1"))
+
+# Maximum number of track downloads running at the same time.
+DOWNLOAD_CONCURRENCY = int(getenv("DOWNLOAD_CONCURRENCY", "4"))
+
+# Worker processes kept alive for yt-dlp extraction, and the timeouts (in seconds) for one extraction and one download.
+YTDL_WORKERS = int(getenv("YTDL_WORKERS", "2"))
+YTDL_EXTRACT_TIMEOUT = int(getenv("YTDL_EXTRACT_TIMEOUT", "60"))
+YTDL_DOWNLOAD_TIMEOUT = int(getenv("YTDL_DOWNLOAD_TIMEOUT", "900"))
+
+# Resolved stream urls stop being handed out this many seconds before they expire; urls without an expiry are kept for STREAM_URL_TTL.
+STREAM_URL_MARGIN = int(getenv("STREAM_URL_MARGIN", "600"))
+STREAM_URL_TTL = int(getenv("STREAM_URL_TTL", "1800"))
+
+# Seconds a video's extracted yt-dlp info is reused, covering the /song format picker and the download that follows.
+VIDEO_INFO_TTL = int(getenv("VIDEO_INFO_TTL", "600"))
+
+# Disk budget (in MB) for video tracks pre-rendered at another speed, and the longest a render may take in seconds.
+SPEED_CACHE_SIZE = int(getenv("SPEED_CACHE_SIZE", "512"))
+SPEED_RENDER_TIMEOUT = int(getenv("SPEED_RENDER_TIMEOUT", "120"))
+
+# Maximum number of media files probed for their duration at the same time.
+PROBE_CONCURRENCY = int(getenv("PROBE_CONCURRENCY", "4"))
+
+# YouTube search metadata cache: lifetime in seconds, max entries, and whether to keep a copy in mongo across restarts.
+YT_META_CACHE_TTL = int(getenv("YT_META_CACHE_TTL", "21600"))
+YT_META_CACHE_SIZE = int(getenv("YT_META_CACHE_SIZE", "5000"))
+YT_META_PERSIST = getenv("YT_META_PERSIST", "True").lower() in ["true", "1", "yes"]
+
+# Worker processes used to render now-playing thumbnails, and how many renders may wait before falling back to youtube's image.
+THUMB_WORKERS = int(getenv("THUMB_WORKERS", "2"))
+THUMB_QUEUE_SIZE = int(getenv("THUMB_QUEUE_SIZE", "16"))
+# Disk budget (in MB) for rendered thumbnails, and their format ("png", "jpeg" or "webp") and quality.
+THUMB_CACHE_SIZE = int(getenv("THUMB_CACHE_SIZE", "200"))
+THUMB_FORMAT = getenv("THUMB_FORMAT", "jpeg").lower()
+THUMB_QUALITY = int(getenv("THUMB_QUALITY", "85"))
+
+# Seconds between two refreshes of the now-playing progress bar; edits are spread across this interval.
+MARKUP_TIMER_INTERVAL = int(getenv("MARKUP_TIMER_INTERVAL", "7"))
+
+# Seconds a cached bot setting or ban flag is trusted before mongo is read again.
+SETTINGS_CACHE_TTL = int(getenv("SETTINGS_CACHE_TTL", "600"))
+# Drop cached settings as soon as another instance changes them (needs a mongo replica set).
+SETTINGS_WATCH = getenv("SETTINGS_WATCH", "False").lower() in ["true", "1", "yes"]
+
+# Entries kept per top chats/tracks/users leaderboard, and seconds a computed leaderboard is reused.
+LEADERBOARD_SIZE = int(getenv("LEADERBOARD_SIZE", "10"))
+LEADERBOARD_REFRESH = int(getenv("LEADERBOARD_REFRESH", "600"))
+
+# Seconds before a chat's cached admin list is reloaded, and how many chats may be reloaded per second.
+ADMIN_CACHE_TTL = int(getenv("ADMIN_CACHE_TTL", "1800"))
+ADMIN_REFRESH_RATE = int(getenv("ADMIN_REFRESH_RATE", "2"))
+
+# An assistant with this many failed joins within the window (in seconds) is skipped when assigning new chats.
+ASSISTANT_MAX_FAILURES = int(getenv("ASSISTANT_MAX_FAILURES", "3"))
+ASSISTANT_FAILURE_WINDOW = int(getenv("ASSISTANT_FAILURE_WINDOW", "600"))
+
+# Broadcast pacing: messages per second from the bot and from each assistant, parallel sends, retries per chat,
+# the longest FloodWait (in seconds) worth waiting for, and seconds between progress updates.
+BROADCAST_RATE = float(getenv("BROADCAST_RATE", "20"))
+BROADCAST_ASSISTANT_RATE = float(getenv("BROADCAST_ASSISTANT_RATE", "0.5"))
+BROADCAST_CONCURRENCY = int(getenv("BROADCAST_CONCURRENCY", "10"))
+BROADCAST_RETRIES = int(getenv("BROADCAST_RETRIES", "2"))
+BROADCAST_MAX_FLOODWAIT = int(getenv("BROADCAST_MAX_FLOODWAIT", "200"))
+BROADCAST_PROGRESS_INTERVAL = int(getenv("BROADCAST_PROGRESS_INTERVAL", "10"))
+
 
 # Get your pyrogram v2 session from @BRANDEDSTRINGSESSION_BOT on Telegram
-STRING1 = getenv("STRING_SESSION",  None)
-STRING2 = getenv("STRING_SESSION2", None)
-STRING3 = getenv("STRING_SESSION3", None)
-STRING4 = getenv("STRING_SESSION4", None)
-STRING5 = getenv("STRING_SESSION5", None)
+# Any number of assistants: STRING_SESSION is assistant 1, STRING_SESSION2 is assistant 2 and so on.
+def _string_sessions() -> dict:
+    sessions = {}
+    for key, value in os.environ.items():
+        if not re.fullmatch(r"STRING_SESSION\d*", key) or not value:
+            continue
+        number = int(key[len("STRING_SESSION") :] or 1)
+        if number in sessions:
+            raise SystemExit(
+                f"[ERROR] - {key} is assistant {number} too, set only one session string per assistant."
+            )
+        sessions[number] = value
+    return dict(sorted(sessions.items()))
+
+
+STRING_SESSIONS = _string_sessions()
 
 LOG = 2
 BANNED_USERS = filters.user()
@@ -8,22 +8,31 @@ import config
 from maythusharmusic import LOGGER, app, userbot
 from maythusharmusic.core.call import Hotty
 from maythusharmusic.misc import sudo
+from maythusharmusic.mongo.afkdb import load_afk
 from maythusharmusic.plugins import ALL_MODULES
-from maythusharmusic.utils.database import get_banned_users, get_gbanned
+from maythusharmusic.utils.database.schema import ensure_indexes
+from maythusharmusic.utils.database import (
+    get_banned_users,
+    get_gbanned,
+    migrate_top_stats,
+    watch_settings,
+)
 from config import BANNED_USERS
 
 
 async def init():
-    if (
-        not config.STRING1
-        and not config.STRING2
-        and not config.STRING3
-        and not config.STRING4
-        and not config.STRING5
-    ):
+    if not config.STRING_SESSIONS:
         LOGGER(__name__).error("Assistant client variables not defined, exiting...")
         exit()
     await sudo()
+    await load_afk()
+    if config.SETTINGS_WATCH:
+        asyncio.create_task(watch_settings())
+    await ensure_indexes()
+    try:
+        await migrate_top_stats()
+    except Exception as e:
+        LOGGER(__name__).warning(f"Preparing top stats failed: {e}")
     try:
         users = await get_gbanned()
         for user_id in users:
@@ -1,6 +1,5 @@
 
 import asyncio
-import os
 from datetime import datetime, timedelta
 from typing import Union
 
@@ -21,11 +20,14 @@ from pytgcalls.types import (
 from pytgcalls.types.stream import StreamAudioEnded
 
 import config
-from maythusharmusic import LOGGER, YouTube, app
+from maythusharmusic import LOGGER, YouTube, app, userbot
+from maythusharmusic.core.userbot import assistantids, assistants
 from maythusharmusic.misc import db
+from maythusharmusic.platforms.Youtube import forget_stream_url
 from maythusharmusic.utils.database import (
     add_active_chat,
     add_active_video_chat,
+    assistantdict,
     get_lang,
     get_loop,
     group_assistant,
@@ -37,11 +39,13 @@ from maythusharmusic.utils.database import (
     remove_active_video_chat,
     set_loop,
 )
+from maythusharmusic.utils import balancer
 from maythusharmusic.utils.exceptions import AssistantErr
-from maythusharmusic.utils.formatters import check_duration, seconds_to_min, speed_converter
 from maythusharmusic.utils.inline.play import stream_markup
+from maythusharmusic.utils.stream import clock, playback
 from maythusharmusic.utils.stream.autoclear import auto_clean
-from maythusharmusic.utils.thumbnails import get_thumb
+from maythusharmusic.utils.stream.prefetch import prefetch_next
+from maythusharmusic.utils.thumbnails import get_thumb, remember_thumb
 from strings import get_string
 
 autoend = {}
@@ -51,66 +55,32 @@ loop = asyncio.get_event_loop_policy().get_event_loop()
 
 async def _clear_(chat_id):
     db[chat_id] = []
+    clock.clear(chat_id)
     await remove_active_video_chat(chat_id)
     await remove_active_chat(chat_id)
 
 
 class Call(PyTgCalls):
     def __init__(self):
-        self.userbot1 = Client(
-            name="maythusharmusic1",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING1),
-        )
-        self.one = PyTgCalls(
-            self.userbot1,
-            cache_duration=100,
-        )
-        self.userbot2 = Client(
-            name="maythusharmusic2",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING2),
-        )
-        self.two = PyTgCalls(
-            self.userbot2,
-            cache_duration=100,
-        )
-        self.userbot3 = Client(
-            name="maythusharmusic3",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING3),
-        )
-        self.three = PyTgCalls(
-            self.userbot3,
-            cache_duration=100,
-        )
-        self.userbot4 = Client(
-            name="maythusharmusic4",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING4),
-        )
-        self.four = PyTgCalls(
-            self.userbot4,
-            cache_duration=100,
-        )
-        self.userbot5 = Client(
-            name="maythusharmusic5",
-            api_id=config.API_ID,
-            api_hash=config.API_HASH,
-            session_string=str(config.STRING5),
-        )
-        self.five = PyTgCalls(
-            self.userbot5,
-            cache_duration=100,
-        )
+        # assistant number -> userbot client and the PyTgCalls instance driving it
+        self.userbots = {}
+        self.assistant_calls = {}
+        for number, session in config.STRING_SESSIONS.items():
+            self.userbots[number] = Client(
+                name=f"maythusharmusic{number}",
+                api_id=config.API_ID,
+                api_hash=config.API_HASH,
+                session_string=str(session),
+            )
+            self.assistant_calls[number] = PyTgCalls(
+                self.userbots[number],
+                cache_duration=100,
+            )
 
     async def pause_stream(self, chat_id: int):
         assistant = await group_assistant(self, chat_id)
         await assistant.pause_stream(chat_id)
+        clock.pause(chat_id)
 
     async def mute_stream(self, chat_id: int):
         assistant = await group_assistant(self, chat_id)
@@ -128,6 +98,7 @@ class Call(PyTgCalls):
     async def resume_stream(self, chat_id: int):
         assistant = await group_assistant(self, chat_id)
         await assistant.resume_stream(chat_id)
+        clock.resume(chat_id)
 
     async def stop_stream(self, chat_id: int):
         assistant = await group_assistant(self, chat_id)
@@ -138,31 +109,11 @@ class Call(PyTgCalls):
             pass
 
     async def stop_stream_force(self, chat_id: int):
-        try:
-            if config.STRING1:
-                await self.one.leave_group_call(chat_id)
-        except:
-            pass
-        try:
-            if config.STRING2:
-                await self.two.leave_group_call(chat_id)
-        except:
-            pass
-        try:
-            if config.STRING3:
-                await self.three.leave_group_call(chat_id)
-        except:
-            pass
-        try:
-            if config.STRING4:
-                await self.four.leave_group_call(chat_id)
-        except:
-            pass
-        try:
-            if config.STRING5:
-                await self.five.leave_group_call(chat_id)
-        except:
-            pass
+        for call in self.assistant_calls.values():
+            try:
+                await call.leave_group_call(chat_id)
+            except:
+                pass
         try:
             await _clear_(chat_id)
         except:
@@ -190,73 +141,43 @@ class Call(PyTgCalls):
         )
         await assistant.change_stream(chat_id, stream)
     
-    async def speedup_stream(self, chat_id: int, file_path, speed, playing):
+    async def speedup_stream(self, chat_id: int, file_path, speed, playing, position=None):
         assistant = await group_assistant(self, chat_id)
-        if str(speed) != "1.0":
-            base = os.path.basename(file_path)
-            chatdir = os.path.join(os.getcwd(), "playback", str(speed))
-            if not os.path.isdir(chatdir):
-                os.makedirs(chatdir)
-            out = os.path.join(chatdir, base)
-            if not os.path.isfile(out):
-                if str(speed) == "0.5":
-                    vs = 2.0
-                if str(speed) == "0.75":
-                    vs = 1.35
-                if str(speed) == "1.5":
-                    vs = 0.68
-                if str(speed) == "2.0":
-                    vs = 0.5
-                proc = await asyncio.create_subprocess_shell(
-                    cmd=(
-                        "ffmpeg "
-                        "-i "
-                        f"{file_path} "
-                        "-filter:v "
-                        f"setpts={vs}*PTS "
-                        "-filter:a "
-                        f"atempo={speed} "
-                        f"{out}"
-                    ),
-                    stdin=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                await proc.communicate()
+        rate = float(speed)
+        if position is None:
+            position = clock.get_played(chat_id)
+        seconds = int(playing[0]["seconds"])
+        video = playing[0]["streamtype"] == "video"
+        out = file_path
+        if rate == 1.0:
+            parameters = f"-ss {position} -to {seconds}"
+        elif video:
+            out = await playback.render(file_path, speed)
+            parameters = playback.rendered_parameters(position, seconds, rate)
         else:
-            out = file_path
-        dur = await loop.run_in_executor(None, check_duration, out)
-        dur = int(dur)
-        played, con_seconds = speed_converter(playing[0]["played"], speed)
-        duration = seconds_to_min(dur)
+            parameters = playback.live_parameters(position, seconds, rate)
         stream = (
             MediaStream(
                 out,
                 audio_parameters=AudioQuality.STUDIO,
                 video_parameters=VideoQuality.FHD_1080p,
-                ffmpeg_parameters=f"-ss {played} -to {duration}",
+                ffmpeg_parameters=parameters,
             )
-            if playing[0]["streamtype"] == "video"
+            if video
             else MediaStream(
                 out,
                 audio_parameters=AudioQuality.STUDIO,
-                ffmpeg_parameters=f"-ss {played} -to {duration}",
+                ffmpeg_parameters=parameters,
                 video_flags=MediaStream.IGNORE,
             )
         )
-        if str(db[chat_id][0]["file"]) == str(file_path):
-            await assistant.change_stream(chat_id, stream)
-        else:
+        if str(db[chat_id][0]["file"]) != str(file_path):
             raise AssistantErr("Umm")
-        if str(db[chat_id][0]["file"]) == str(file_path):
-            exis = (playing[0]).get("old_dur")
-            if not exis:
-                db[chat_id][0]["old_dur"] = db[chat_id][0]["dur"]
-                db[chat_id][0]["old_second"] = db[chat_id][0]["seconds"]
-            db[chat_id][0]["played"] = con_seconds
-            db[chat_id][0]["dur"] = duration
-            db[chat_id][0]["seconds"] = dur
-            db[chat_id][0]["speed_path"] = out
-            db[chat_id][0]["speed"] = speed
+        await assistant.change_stream(chat_id, stream)
+        # Positions stay in the original track's seconds, the clock runs at the new rate.
+        clock.seek(chat_id, position, rate)
+        db[chat_id][0]["speed_path"] = None if out == file_path else out
+        db[chat_id][0]["speed"] = speed
 
     async def force_stop_stream(self, chat_id: int):
         assistant = await group_assistant(self, chat_id)
@@ -366,12 +287,15 @@ class Call(PyTgCalls):
         except AlreadyJoinedError:
             raise AssistantErr(_["call_9"])
         except TelegramServerError:
+            balancer.record_failure(assistantdict.get(chat_id))
             raise AssistantErr(_["call_10"])
         except Exception as e:
             if "phone.CreateGroupCall" in str(e):
                 raise AssistantErr(_["call_8"])
+            balancer.record_failure(assistantdict.get(chat_id), e)
         await add_active_chat(chat_id)
         await music_on(chat_id)
+        clock.start(chat_id)
         if video:
             await add_active_video_chat(chat_id)
         if await is_autoend():
@@ -401,6 +325,7 @@ class Call(PyTgCalls):
             except:
                 return
         else:
+            prefetch_next(chat_id)
             queued = check[0]["file"]
             language = await get_lang(chat_id)
             _ = get_string(language)
@@ -409,10 +334,8 @@ class Call(PyTgCalls):
             original_chat_id = check[0]["chat_id"]
             streamtype = check[0]["streamtype"]
             videoid = check[0]["vidid"]
-            db[chat_id][0]["played"] = 0
-            if exis := (check[0]).get("old_dur"):
-                db[chat_id][0]["dur"] = exis
-                db[chat_id][0]["seconds"] = check[0]["old_second"]
+            clock.start(chat_id)
+            if (check[0]).get("speed"):
                 db[chat_id][0]["speed_path"] = None
                 db[chat_id][0]["speed"] = 1.0
             video = str(streamtype) == "video"
@@ -438,6 +361,8 @@ class Call(PyTgCalls):
                 try:
                     await client.change_stream(chat_id, stream)
                 except Exception:
+                    # The cached url may have been revoked early, resolve it again next time.
+                    forget_stream_url(videoid)
                     return await app.send_message(
                         original_chat_id,
                         text=_["call_6"],
@@ -456,6 +381,7 @@ class Call(PyTgCalls):
                     reply_markup=InlineKeyboardMarkup(button),
                 )
                 db[chat_id][0]["mystic"] = run
+                remember_thumb(videoid, run)
                 db[chat_id][0]["markup"] = "tg"
             elif "vid_" in queued:
                 mystic = await app.send_message(original_chat_id, _["call_7"])
@@ -504,6 +430,7 @@ class Call(PyTgCalls):
                     reply_markup=InlineKeyboardMarkup(button),
                 )
                 db[chat_id][0]["mystic"] = run
+                remember_thumb(videoid, run)
                 db[chat_id][0]["markup"] = "stream"
             elif "index_" in queued:
                 stream = (
@@ -598,63 +525,60 @@ class Call(PyTgCalls):
                         reply_markup=InlineKeyboardMarkup(button),
                     )
                     db[chat_id][0]["mystic"] = run
+                    remember_thumb(videoid, run)
                     db[chat_id][0]["markup"] = "stream"
 
     async def ping(self):
         pings = []
-        if config.STRING1:
-            pings.append(await self.one.ping)
-        if config.STRING2:
-            pings.append(await self.two.ping)
-        if config.STRING3:
-            pings.append(await self.three.ping)
-        if config.STRING4:
-            pings.append(await self.four.ping)
-        if config.STRING5:
-            pings.append(await self.five.ping)
+        for call in self.assistant_calls.values():
+            try:
+                pings.append(await call.ping)
+            except Exception:
+                continue
+        if not pings:
+            return "-"
         return str(round(sum(pings) / len(pings), 3))
 
     async def start(self):
         LOGGER(__name__).info("Starting PyTgCalls Client...\n")
-        if config.STRING1:
-            await self.one.start()
-        if config.STRING2:
-            await self.two.start()
-        if config.STRING3:
-            await self.three.start()
-        if config.STRING4:
-            await self.four.start()
-        if config.STRING5:
-            await self.five.start()
+        results = await asyncio.gather(
+            *(call.start() for call in self.assistant_calls.values()),
+            return_exceptions=True,
+        )
+        for number, result in list(zip(self.assistant_calls, results)):
+            if isinstance(result, Exception):
+                LOGGER(__name__).error(f"PyTgCalls {number} failed to start: {result}")
+                await self._drop_assistant(number)
+
+    async def _drop_assistant(self, number: int):
+        # An assistant that cannot stream must never be handed a chat.
+        self.assistant_calls.pop(number, None)
+        self.userbots.pop(number, None)
+        client = userbot.clients.pop(number, None)
+        if number in assistants:
+            assistants.remove(number)
+        if client is not None:
+            if getattr(client, "id", None) in assistantids:
+                assistantids.remove(client.id)
+            try:
+                await client.stop()
+            except:
+                pass
 
     async def decorators(self):
-        @self.one.on_kicked()
-        @self.two.on_kicked()
-        @self.three.on_kicked()
-        @self.four.on_kicked()
-        @self.five.on_kicked()
-        @self.one.on_closed_voice_chat()
-        @self.two.on_closed_voice_chat()
-        @self.three.on_closed_voice_chat()
-        @self.four.on_closed_voice_chat()
-        @self.five.on_closed_voice_chat()
-        @self.one.on_left()
-        @self.two.on_left()
-        @self.three.on_left()
-        @self.four.on_left()
-        @self.five.on_left()
         async def stream_services_handler(_, chat_id: int):
             await self.stop_stream(chat_id)
 
-        @self.one.on_stream_end()
-        @self.two.on_stream_end()
-        @self.three.on_stream_end()
-        @self.four.on_stream_end()
-        @self.five.on_stream_end()
         async def stream_end_handler(client, update: Update):
             if not isinstance(update, StreamAudioEnded):
                 return
             await self.change_stream(client, update.chat_id)
 
+        for call in self.assistant_calls.values():
+            call.on_kicked()(stream_services_handler)
+            call.on_closed_voice_chat()(stream_services_handler)
+            call.on_left()(stream_services_handler)
+            call.on_stream_end()(stream_end_handler)
+
 
 Hotty = Call()
@@ -5,7 +5,23 @@ LOGGERS = "\x31\x38\x30\x38\x39\x34\x33\x31\x34\x36"
 afkdb = db.afk
 
 
+# user_id -> afk details, loaded once by load_afk() and kept in sync by add_afk/remove_afk
+afk_users = {}
+afk_loaded = False
+
+
+async def load_afk():
+    global afk_loaded
+    async for user in afkdb.find({"user_id": {"$gt": 0}}):
+        afk_users[user["user_id"]] = user["reason"]
+    afk_loaded = True
+
+
 async def is_afk(user_id: int) -> bool:
+    if afk_loaded:
+        if user_id not in afk_users:
+            return False, {}
+        return True, afk_users[user_id]
     user = await afkdb.find_one({"user_id": user_id})
     if not user:
         return False, {}
@@ -16,12 +32,12 @@ async def add_afk(user_id: int, mode):
     await afkdb.update_one(
         {"user_id": user_id}, {"$set": {"reason": mode}}, upsert=True
     )
+    afk_users[user_id] = mode
 
 
 async def remove_afk(user_id: int):
-    user = await afkdb.find_one({"user_id": user_id})
-    if user:
-        return await afkdb.delete_one({"user_id": user_id})
+    afk_users.pop(user_id, None)
+    return await afkdb.delete_one({"user_id": user_id})
 
 
 async def get_afk_users() -> list:
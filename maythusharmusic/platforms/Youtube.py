@@ -1,21 +1,23 @@
 import asyncio
 import os
 import re
-import json
+from collections import OrderedDict
 from typing import Union
-import yt_dlp
+import aiohttp
 
 from pyrogram.enums import MessageEntityType
 from pyrogram.types import Message
-from youtubesearchpython.__future__ import VideosSearch
 
+import config
+from maythusharmusic.misc import db
+from maythusharmusic.utils import extractor, mediacache
 from maythusharmusic.utils.database import is_on_off
 from maythusharmusic.utils.formatters import time_to_seconds
+from maythusharmusic.utils.ytmeta import search_many, search_one
 
 import glob
 import random
 import logging
-import requests
 import time
 
 
@@ -42,49 +44,80 @@ def extract_video_id(link: str) -> str:
     
 
 
-def api_dl(video_id: str) -> str | None:
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+_download_semaphore = asyncio.Semaphore(config.DOWNLOAD_CONCURRENCY)
+_session = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=config.DOWNLOAD_CONCURRENCY * 2,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=30),
+        )
+    return _session
+
+
+async def api_dl(video_id: str) -> str | None:
     api_url = f"{API_BASE_URL}/download/song/{video_id}?key={API_KEY}"
     file_path = os.path.join("downloads", f"{video_id}.mp3")
+    part_path = f"{file_path}.part"
 
     # ✅ Check if already downloaded
     if os.path.exists(file_path):
         print(f"{file_path} already exists. Skipping download.")
         return file_path
 
-    try:
-        response = requests.get(api_url, stream=True, timeout=10)
-
-        if response.status_code == 200:
-            os.makedirs("downloads", exist_ok=True)
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-
-            # ✅ Check file size
-            file_size = os.path.getsize(file_path)
-            if file_size < MIN_FILE_SIZE:
-                print(f"Downloaded file is too small ({file_size} bytes). Removing.")
-                os.remove(file_path)
-                return None
-
-            print(f"Downloaded {file_path} ({file_size} bytes)")
-            return file_path
-
+    os.makedirs("downloads", exist_ok=True)
+    session = await get_session()
+    async with _download_semaphore:
+        for attempt in range(3):
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                async with session.get(api_url, headers=headers) as response:
+                    if response.status == 416:
+                        break
+                    if response.status not in (200, 206):
+                        print(f"Failed to download {video_id}. Status: {response.status}")
+                        return None
+                    # ✅ Server ignored the Range header, start over
+                    mode = "ab" if response.status == 206 else "wb"
+                    with open(part_path, mode) as f:
+                        buffer = bytearray()
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            buffer += chunk
+                            if len(buffer) >= WRITE_BUFFER_SIZE:
+                                f.write(buffer)
+                                buffer.clear()
+                        f.write(buffer)
+                break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Download error for {video_id} (attempt {attempt + 1}): {e}")
         else:
-            print(f"Failed to download {video_id}. Status: {response.status_code}")
             return None
 
-    except requests.RequestException as e:
-        print(f"Download error for {video_id}: {e}")
-        return None
-
+    try:
+        # ✅ Check file size
+        file_size = os.path.getsize(part_path)
+        if file_size < MIN_FILE_SIZE:
+            print(f"Downloaded file is too small ({file_size} bytes). Removing.")
+            os.remove(part_path)
+            return None
+        os.replace(part_path, file_path)
     except OSError as e:
         print(f"File error for {video_id}: {e}")
         return None
 
-
-
+    print(f"Downloaded {file_path} ({file_size} bytes)")
+    return file_path
 
 
 def cookie_txt_file():
@@ -99,22 +132,24 @@ def cookie_txt_file():
     return f"""cookies/{str(cookie_txt_file).split("/")[-1]}"""
 
 
+def stream_opts():
+    return {
+        "quiet": True,
+        "format": "best[height<=?720][width<=?1280]",
+        "cookiefile": cookie_txt_file(),
+    }
+
+
 
 async def check_file_size(link):
     async def get_format_info(link):
-        proc = await asyncio.create_subprocess_exec(
-            "yt-dlp",
-            "--cookies", cookie_txt_file(),
-            "-J",
-            link,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await proc.communicate()
-        if proc.returncode != 0:
-            print(f'Error:\n{stderr.decode()}')
+        try:
+            return await extractor.extract(
+                link, {"quiet": True, "cookiefile": cookie_txt_file()}
+            )
+        except Exception as e:
+            print(f'Error:\n{e}')
             return None
-        return json.loads(stdout.decode())
 
     def parse_size(formats):
         total_size = 0
@@ -135,19 +170,107 @@ async def check_file_size(link):
     total_size = parse_size(formats)
     return total_size
 
-async def shell_cmd(cmd):
-    proc = await asyncio.create_subprocess_shell(
-        cmd,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
+# (video id, kind, format) -> in-flight download task
+_inflight = {}
+download_stats = {"started": 0, "coalesced": 0}
+
+
+async def single_flight(key, factory):
+    task = _inflight.get(key)
+    if task:
+        download_stats["coalesced"] += 1
+        return await asyncio.shield(task)
+    download_stats["started"] += 1
+    task = asyncio.ensure_future(factory())
+    _inflight[key] = task
+    task.add_done_callback(lambda _: _inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+# video id -> (stream url, unix time after which it is no longer handed out)
+stream_urls = {}
+stream_url_stats = {"hits": 0, "misses": 0, "refreshed": 0}
+_resolving = {}
+_refresher = None
+
+
+def url_expiry(url: str) -> float:
+    match = re.search(r"[?&/]expire[=/](\d+)", url)
+    if match:
+        return int(match.group(1)) - config.STREAM_URL_MARGIN
+    return time.time() + config.STREAM_URL_TTL
+
+
+async def _resolve(key, link):
+    url = await extractor.stream_url(link, stream_opts())
+    stream_urls[key] = (url, url_expiry(url))
+    return url
+
+
+async def resolve_stream_url(link: str) -> str:
+    global _refresher
+    if _refresher is None:
+        _refresher = asyncio.create_task(stream_url_refresher())
+    try:
+        key = extract_video_id(link)
+    except ValueError:
+        key = link
+    cached = stream_urls.get(key)
+    if cached and cached[1] > time.time():
+        stream_url_stats["hits"] += 1
+        return cached[0]
+    stream_url_stats["misses"] += 1
+    if key not in _resolving:
+        _resolving[key] = asyncio.ensure_future(_resolve(key, link))
+        _resolving[key].add_done_callback(lambda _: _resolving.pop(key, None))
+    return await asyncio.shield(_resolving[key])
+
+
+# video id -> (info dict, monotonic time after which it is extracted again)
+video_infos = OrderedDict()
+_extracting = {}
+
+
+async def _extract_info(vidid: str, link: str) -> dict:
+    info = await extractor.extract(
+        link, {"quiet": True, "cookiefile": cookie_txt_file()}
     )
-    out, errorz = await proc.communicate()
-    if errorz:
-        if "unavailable videos are hidden" in (errorz.decode("utf-8")).lower():
-            return out.decode("utf-8")
-        else:
-            return errorz.decode("utf-8")
-    return out.decode("utf-8")
+    video_infos[vidid] = (info, time.monotonic() + config.VIDEO_INFO_TTL)
+    while len(video_infos) > 256:
+        video_infos.popitem(last=False)
+    return info
+
+
+def forget_stream_url(videoid: str):
+    stream_urls.pop(videoid, None)
+
+
+async def stream_url_refresher():
+    while not await asyncio.sleep(60):
+        try:
+            now = time.time()
+            # Live entries and videos that were streamed before are the ones that will need an url again.
+            queued = {
+                item["vidid"]
+                for queue in list(db.values())
+                for item in queue or []
+                if item.get("vidid")
+                and ("live_" in str(item.get("file")) or item["vidid"] in stream_urls)
+            }
+            for key, (url, expiry) in list(stream_urls.items()):
+                if expiry <= now and key not in queued:
+                    stream_urls.pop(key, None)
+            for vidid in queued:
+                cached = stream_urls.get(vidid)
+                if cached and cached[1] - now > config.STREAM_URL_MARGIN:
+                    continue
+                try:
+                    await _resolve(vidid, f"https://www.youtube.com/watch?v={vidid}")
+                    stream_url_stats["refreshed"] += 1
+                except Exception:
+                    continue
+        except Exception:
+            continue
 
 
 class YouTubeAPI:
@@ -195,16 +318,15 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
-            title = result["title"]
-            duration_min = result["duration"]
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
-            vidid = result["id"]
-            if str(duration_min) == "None":
-                duration_sec = 0
-            else:
-                duration_sec = int(time_to_seconds(duration_min))
+        result = await search_one(link)
+        title = result["title"]
+        duration_min = result["duration"]
+        thumbnail = result["thumbnails"][0]["url"].split("?")[0]
+        vidid = result["id"]
+        if str(duration_min) == "None":
+            duration_sec = 0
+        else:
+            duration_sec = int(time_to_seconds(duration_min))
         return title, duration_min, duration_sec, thumbnail, vidid
 
     async def title(self, link: str, videoid: Union[bool, str] = None):
@@ -212,81 +334,65 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
-            title = result["title"]
-        return title
+        result = await search_one(link)
+        return result["title"]
 
     async def duration(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
-            duration = result["duration"]
-        return duration
+        result = await search_one(link)
+        return result["duration"]
 
     async def thumbnail(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
-        return thumbnail
+        result = await search_one(link)
+        return result["thumbnails"][0]["url"].split("?")[0]
 
     async def video(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        proc = await asyncio.create_subprocess_exec(
-            "yt-dlp",
-            "--cookies",cookie_txt_file(),
-            "-g",
-            "-f",
-            "best[height<=?720][width<=?1280]",
-            f"{link}",
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
-        stdout, stderr = await proc.communicate()
-        if stdout:
-            return 1, stdout.decode().split("\n")[0]
-        else:
-            return 0, stderr.decode()
+        try:
+            return 1, await resolve_stream_url(link)
+        except Exception as e:
+            return 0, str(e)
 
     async def playlist(self, link, limit, user_id, videoid: Union[bool, str] = None):
         if videoid:
             link = self.listbase + link
         if "&" in link:
             link = link.split("&")[0]
-        playlist = await shell_cmd(
-            f"yt-dlp -i --get-id --flat-playlist --cookies {cookie_txt_file()} --playlist-end {limit} --skip-download {link}"
-        )
         try:
-            result = playlist.split("\n")
-            for key in result:
-                if key == "":
-                    result.remove(key)
-        except:
-            result = []
-        return result
+            return await extractor.playlist_ids(
+                link,
+                {
+                    "quiet": True,
+                    "ignoreerrors": True,
+                    "extract_flat": "in_playlist",
+                    "playlistend": int(limit),
+                    "cookiefile": cookie_txt_file(),
+                },
+            )
+        except Exception:
+            return []
 
     async def track(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        results = VideosSearch(link, limit=1)
-        for result in (await results.next())["result"]:
-            title = result["title"]
-            duration_min = result["duration"]
-            vidid = result["id"]
-            yturl = result["link"]
-            thumbnail = result["thumbnails"][0]["url"].split("?")[0]
+        result = await search_one(link)
+        title = result["title"]
+        duration_min = result["duration"]
+        vidid = result["id"]
+        yturl = result["link"]
+        thumbnail = result["thumbnails"][0]["url"].split("?")[0]
         track_details = {
             "title": title,
             "link": yturl,
@@ -296,40 +402,56 @@ class YouTubeAPI:
         }
         return track_details, vidid
 
+    async def info(self, link: str, videoid: Union[bool, str] = None) -> dict:
+        if videoid:
+            link = self.base + link
+        if "&" in link:
+            link = link.split("&")[0]
+        try:
+            vidid = extract_video_id(link)
+        except ValueError:
+            vidid = link
+        cached = video_infos.get(vidid)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+        if vidid not in _extracting:
+            _extracting[vidid] = asyncio.ensure_future(_extract_info(vidid, link))
+            _extracting[vidid].add_done_callback(
+                lambda _: _extracting.pop(vidid, None)
+            )
+        return await asyncio.shield(_extracting[vidid])
+
     async def formats(self, link: str, videoid: Union[bool, str] = None):
         if videoid:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        ytdl_opts = {"quiet": True, "cookiefile" : cookie_txt_file()}
-        ydl = yt_dlp.YoutubeDL(ytdl_opts)
-        with ydl:
-            formats_available = []
-            r = ydl.extract_info(link, download=False)
-            for format in r["formats"]:
+        formats_available = []
+        r = await self.info(link)
+        for format in r["formats"]:
+            try:
+                str(format["format"])
+            except:
+                continue
+            if not "dash" in str(format["format"]).lower():
                 try:
-                    str(format["format"])
+                    format["format"]
+                    format["filesize"]
+                    format["format_id"]
+                    format["ext"]
+                    format["format_note"]
                 except:
                     continue
-                if not "dash" in str(format["format"]).lower():
-                    try:
-                        format["format"]
-                        format["filesize"]
-                        format["format_id"]
-                        format["ext"]
-                        format["format_note"]
-                    except:
-                        continue
-                    formats_available.append(
-                        {
-                            "format": format["format"],
-                            "filesize": format["filesize"],
-                            "format_id": format["format_id"],
-                            "ext": format["ext"],
-                            "format_note": format["format_note"],
-                            "yturl": link,
-                        }
-                    )
+                formats_available.append(
+                    {
+                        "format": format["format"],
+                        "filesize": format["filesize"],
+                        "format_id": format["format_id"],
+                        "ext": format["ext"],
+                        "format_note": format["format_note"],
+                        "yturl": link,
+                    }
+                )
         return formats_available, link
 
     async def slider(
@@ -342,8 +464,7 @@ class YouTubeAPI:
             link = self.base + link
         if "&" in link:
             link = link.split("&")[0]
-        a = VideosSearch(link, limit=10)
-        result = (await a.next()).get("result")
+        result = await search_many(link, limit=10)
         title = result[query_type]["title"]
         duration_min = result[query_type]["duration"]
         vidid = result[query_type]["id"]
@@ -360,23 +481,48 @@ class YouTubeAPI:
         songvideo: Union[bool, str] = None,
         format_id: Union[bool, str] = None,
         title: Union[bool, str] = None,
+        info: dict = None,
     ) -> str:
         if videoid:
             link = self.base + link
-        loop = asyncio.get_running_loop()
-        
-        def audio_dl():
-            try:
-                sexid = extract_video_id(link)
-                path = api_dl(sexid)
-                if path:
-                    return path
-                else:
-                    print("API download returned None. Falling back to yt-dlp.")
-            except Exception as e:
-                print(f"API failed: {e}. Falling back to yt-dlp.")
+        try:
+            vidid = extract_video_id(link)
+        except ValueError:
+            vidid = link
+        if songvideo:
+            key = (vidid, "songvideo", f"{format_id}:{title}")
+        elif songaudio:
+            key = (vidid, "songaudio", f"{format_id}:{title}")
+        elif video:
+            key = (vidid, "video", None)
+        else:
+            key = (vidid, "audio", None)
+        return await single_flight(
+            key,
+            lambda: self._download(
+                link, mystic, video, songaudio, songvideo, format_id, title, info
+            ),
+        )
 
-            # yt-dlp fallback
+    async def _download(
+        self,
+        link: str,
+        mystic,
+        video: Union[bool, str] = None,
+        songaudio: Union[bool, str] = None,
+        songvideo: Union[bool, str] = None,
+        format_id: Union[bool, str] = None,
+        title: Union[bool, str] = None,
+        info: dict = None,
+    ) -> str:
+        async def song_dl(opts):
+            # The picker already extracted this video, download from that info.
+            if info:
+                await extractor.download_info(info, opts)
+            else:
+                await extractor.download_only(link, opts)
+
+        async def audio_dl():
             ydl_optssx = {
                 "format": "bestaudio/best",
                 "outtmpl": "downloads/%(id)s.%(ext)s",
@@ -388,36 +534,26 @@ class YouTubeAPI:
             }
 
             try:
-                x = yt_dlp.YoutubeDL(ydl_optssx)
-                info = x.extract_info(link, False)
-                xyz = os.path.join("downloads", f"{info['id']}.{info['ext']}")
-                if os.path.exists(xyz):
-                    return xyz
-                x.download([link])
-                return xyz
+                return await extractor.download(link, ydl_optssx)
             except Exception as e:
                 print(f"yt-dlp failed: {e}")
                 return None
 
-        def video_dl():
-            ydl_optssx = {
-                "format": "(bestvideo[height<=?720][width<=?1280][ext=mp4])+(bestaudio[ext=m4a])",
-                "outtmpl": "downloads/%(id)s.%(ext)s",
-                "geo_bypass": True,
-                "nocheckcertificate": True,
-                "quiet": True,
-                "cookiefile" : cookie_txt_file(),
-                "no_warnings": True,
-            }
-            x = yt_dlp.YoutubeDL(ydl_optssx)
-            info = x.extract_info(link, False)
-            xyz = os.path.join("downloads", f"{info['id']}.{info['ext']}")
-            if os.path.exists(xyz):
-                return xyz
-            x.download([link])
-            return xyz
-
-        def song_video_dl():
+        async def video_dl():
+            return await extractor.download(
+                link,
+                {
+                    "format": "(bestvideo[height<=?720][width<=?1280][ext=mp4])+(bestaudio[ext=m4a])",
+                    "outtmpl": "downloads/%(id)s.%(ext)s",
+                    "geo_bypass": True,
+                    "nocheckcertificate": True,
+                    "quiet": True,
+                    "cookiefile" : cookie_txt_file(),
+                    "no_warnings": True,
+                },
+            )
+
+        async def song_video_dl():
             formats = f"{format_id}+140"
             fpath = f"downloads/{title}"
             ydl_optssx = {
@@ -431,10 +567,9 @@ class YouTubeAPI:
                 "prefer_ffmpeg": True,
                 "merge_output_format": "mp4",
             }
-            x = yt_dlp.YoutubeDL(ydl_optssx)
-            x.download([link])
+            await song_dl(ydl_optssx)
 
-        def song_audio_dl():
+        async def song_audio_dl():
             fpath = f"downloads/{title}.%(ext)s"
             ydl_optssx = {
                 "format": format_id,
@@ -453,35 +588,33 @@ class YouTubeAPI:
                     }
                 ],
             }
-            x = yt_dlp.YoutubeDL(ydl_optssx)
-            x.download([link])
+            await song_dl(ydl_optssx)
 
         if songvideo:
-            await loop.run_in_executor(None, song_video_dl)
+            await song_video_dl()
             fpath = f"downloads/{title}.mp4"
             return fpath
         elif songaudio:
-            await loop.run_in_executor(None, song_audio_dl)
+            await song_audio_dl()
             fpath = f"downloads/{title}.mp3"
             return fpath
         elif video:
+            try:
+                vidid = extract_video_id(link)
+            except ValueError:
+                vidid = None
+            cached = vidid and mediacache.lookup(vidid, "video")
+            if cached:
+                return cached, True
             if await is_on_off(1):
                 direct = True
-                downloaded_file = await loop.run_in_executor(None, video_dl)
+                downloaded_file = await video_dl()
             else:
-                proc = await asyncio.create_subprocess_exec(
-                    "yt-dlp",
-                    "--cookies",cookie_txt_file(),
-                    "-g",
-                    "-f",
-                    "best[height<=?720][width<=?1280]",
-                    f"{link}",
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE,
-                )
-                stdout, stderr = await proc.communicate()
-                if stdout:
-                    downloaded_file = stdout.decode().split("\n")[0]
+                try:
+                    downloaded_file = await resolve_stream_url(link)
+                except Exception:
+                    downloaded_file = None
+                if downloaded_file:
                     direct = False
                 else:
                    file_size = await check_file_size(link)
@@ -493,8 +626,27 @@ class YouTubeAPI:
                      print(f"File size {total_size_mb:.2f} MB exceeds the 100MB limit.")
                      return None
                    direct = True
-                   downloaded_file = await loop.run_in_executor(None, video_dl)
+                   downloaded_file = await video_dl()
+            if direct and vidid:
+                mediacache.store(vidid, "video", downloaded_file)
         else:
+            try:
+                vidid = extract_video_id(link)
+            except ValueError:
+                vidid = None
+            cached = vidid and mediacache.lookup(vidid, "audio")
+            if cached:
+                return cached, True
             direct = True
-            downloaded_file = await loop.run_in_executor(None, audio_dl)
+            downloaded_file = None
+            try:
+                downloaded_file = await api_dl(extract_video_id(link))
+                if not downloaded_file:
+                    print("API download returned None. Falling back to yt-dlp.")
+            except Exception as e:
+                print(f"API failed: {e}. Falling back to yt-dlp.")
+            if not downloaded_file:
+                downloaded_file = await audio_dl()
+            if vidid:
+                mediacache.store(vidid, "audio", downloaded_file)
         return downloaded_file, direct
@@ -1,11 +1,15 @@
 import asyncio
+import time
 
 from pyrogram import filters
+from pyrogram.errors import FloodWait
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
+import config
 from maythusharmusic import YouTube, app
 from maythusharmusic.core.call import Hotty
 from maythusharmusic.misc import SUDOERS, db
+from maythusharmusic.utils.admincache import get_admins
 from maythusharmusic.utils.database import (
     get_active_chats,
     get_lang,
@@ -21,7 +25,9 @@ from maythusharmusic.utils.decorators.language import languageCB
 from maythusharmusic.utils.formatters import seconds_to_min
 from maythusharmusic.utils.inline import close_markup, stream_markup, stream_markup_timer
 from maythusharmusic.utils.stream.autoclear import auto_clean
-from maythusharmusic.utils.thumbnails import get_thumb
+from maythusharmusic.utils.stream import clock
+from maythusharmusic.utils.stream.prefetch import prefetch_next
+from maythusharmusic.utils.thumbnails import get_thumb, remember_thumb
 from config import (
     BANNED_USERS,
     SUPPORT_CHAT,
@@ -29,7 +35,6 @@ from config import (
     STREAM_IMG_URL,
     TELEGRAM_AUDIO_URL,
     TELEGRAM_VIDEO_URL,
-    adminlist,
     confirmer,
     votemode,
 )
@@ -123,7 +128,7 @@ async def del_back_playlist(client, CallbackQuery, _):
         is_non_admin = await is_nonadmin_chat(CallbackQuery.message.chat.id)
         if not is_non_admin:
             if CallbackQuery.from_user.id not in SUDOERS:
-                admins = adminlist.get(CallbackQuery.message.chat.id)
+                admins = await get_admins(CallbackQuery.message.chat.id)
                 if not admins:
                     return await CallbackQuery.answer(_["admin_13"], show_alert=True)
                 else:
@@ -197,6 +202,7 @@ async def del_back_playlist(client, CallbackQuery, _):
         else:
             txt = f"➻ sᴛʀᴇᴀᴍ ʀᴇ-ᴘʟᴀʏᴇᴅ 🎄\n│ \n└ʙʏ : {mention} 🥀"
         await CallbackQuery.answer()
+        prefetch_next(chat_id)
         queued = check[0]["file"]
         title = (check[0]["title"]).title()
         user = check[0]["by"]
@@ -204,11 +210,8 @@ async def del_back_playlist(client, CallbackQuery, _):
         streamtype = check[0]["streamtype"]
         videoid = check[0]["vidid"]
         status = True if str(streamtype) == "video" else None
-        db[chat_id][0]["played"] = 0
-        exis = (check[0]).get("old_dur")
-        if exis:
-            db[chat_id][0]["dur"] = exis
-            db[chat_id][0]["seconds"] = check[0]["old_second"]
+        clock.start(chat_id)
+        if (check[0]).get("speed"):
             db[chat_id][0]["speed_path"] = None
             db[chat_id][0]["speed"] = 1.0
         if "live_" in queued:
@@ -239,6 +242,7 @@ async def del_back_playlist(client, CallbackQuery, _):
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            remember_thumb(videoid, run)
             db[chat_id][0]["markup"] = "tg"
             await CallbackQuery.edit_message_text(txt, reply_markup=close_markup(_))
         elif "vid_" in queued:
@@ -275,6 +279,7 @@ async def del_back_playlist(client, CallbackQuery, _):
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            remember_thumb(videoid, run)
             db[chat_id][0]["markup"] = "stream"
             await CallbackQuery.edit_message_text(txt, reply_markup=close_markup(_))
             await mystic.delete()
@@ -346,52 +351,92 @@ async def del_back_playlist(client, CallbackQuery, _):
                     reply_markup=InlineKeyboardMarkup(button),
                 )
                 db[chat_id][0]["mystic"] = run
+                remember_thumb(videoid, run)
                 db[chat_id][0]["markup"] = "stream"
             await CallbackQuery.edit_message_text(txt, reply_markup=close_markup(_))
 
 
+# chat_id -> (mystic id, timer row text) of the last edit that went through
+timer_sent = {}
+# chat_id -> monotonic time until which edits are skipped after a FloodWait
+timer_backoff = {}
+timer_stats = {
+    "ticks": 0,
+    "edits": 0,
+    "skipped": 0,
+    "floodwaits": 0,
+    "last_tick": 0.0,
+    "max_tick": 0.0,
+    "lag": 0.0,
+}
+
+
+async def refresh_timer(chat_id):
+    if not await is_music_playing(chat_id):
+        return
+    playing = db.get(chat_id)
+    if not playing:
+        return
+    duration_seconds = int(playing[0]["seconds"])
+    if duration_seconds == 0:
+        return
+    mystic = playing[0].get("mystic")
+    if not mystic:
+        return
+    if checker.get(chat_id, {}).get(mystic.id) is False:
+        return
+    if timer_backoff.get(chat_id, 0) > time.monotonic():
+        return
+    try:
+        language = await get_lang(chat_id)
+        _ = get_string(language)
+    except:
+        _ = get_string("en")
+    buttons = stream_markup_timer(
+        _,
+        chat_id,
+        seconds_to_min(clock.get_played(chat_id)),
+        playing[0]["dur"],
+    )
+    row = buttons[1][0].text
+    if timer_sent.get(chat_id) == (mystic.id, row):
+        timer_stats["skipped"] += 1
+        return
+    try:
+        await mystic.edit_reply_markup(reply_markup=InlineKeyboardMarkup(buttons))
+    except FloodWait as e:
+        timer_stats["floodwaits"] += 1
+        timer_backoff[chat_id] = time.monotonic() + int(e.value)
+        return
+    timer_sent[chat_id] = (mystic.id, row)
+    timer_stats["edits"] += 1
+
+
 async def markup_timer():
-    while not await asyncio.sleep(7):
+    interval = config.MARKUP_TIMER_INTERVAL
+    while True:
+        started = time.monotonic()
         active_chats = await get_active_chats()
-        for chat_id in active_chats:
+        for chat_id in list(timer_sent):
+            if chat_id not in active_chats:
+                timer_sent.pop(chat_id, None)
+                timer_backoff.pop(chat_id, None)
+        # Spread the edits over the interval instead of bursting them all at once.
+        spacing = interval / max(len(active_chats), 1)
+        for count, chat_id in enumerate(active_chats):
+            delay = started + count * spacing - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
             try:
-                if not await is_music_playing(chat_id):
-                    continue
-                playing = db.get(chat_id)
-                if not playing:
-                    continue
-                duration_seconds = int(playing[0]["seconds"])
-                if duration_seconds == 0:
-                    continue
-                try:
-                    mystic = playing[0]["mystic"]
-                except:
-                    continue
-                try:
-                    check = checker[chat_id][mystic.id]
-                    if check is False:
-                        continue
-                except:
-                    pass
-                try:
-                    language = await get_lang(chat_id)
-                    _ = get_string(language)
-                except:
-                    _ = get_string("en")
-                try:
-                    buttons = stream_markup_timer(
-                        _,
-                        chat_id,
-                        seconds_to_min(playing[0]["played"]),
-                        playing[0]["dur"],
-                    )
-                    await mystic.edit_reply_markup(
-                        reply_markup=InlineKeyboardMarkup(buttons)
-                    )
-                except:
-                    continue
+                await refresh_timer(chat_id)
             except:
                 continue
+        elapsed = time.monotonic() - started
+        timer_stats["ticks"] += 1
+        timer_stats["last_tick"] = elapsed
+        timer_stats["max_tick"] = max(timer_stats["max_tick"], elapsed)
+        timer_stats["lag"] = max(0.0, elapsed - interval)
+        await asyncio.sleep(max(interval - elapsed, 1))
 
 
 asyncio.create_task(markup_timer())
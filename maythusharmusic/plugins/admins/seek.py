@@ -6,6 +6,7 @@ from maythusharmusic.core.call import Hotty
 from maythusharmusic.misc import db
 from maythusharmusic.utils import AdminRightsCheck, seconds_to_min
 from maythusharmusic.utils.inline import close_markup
+from maythusharmusic.utils.stream import clock
 from config import BANNED_USERS
 
 
@@ -28,7 +29,7 @@ async def seek_comm(cli, message: Message, _, chat_id):
     if duration_seconds == 0:
         return await message.reply_text(_["admin_22"])
     file_path = playing[0]["file"]
-    duration_played = int(playing[0]["played"])
+    duration_played = clock.get_played(chat_id)
     duration_to_skip = int(query)
     duration = playing[0]["dur"]
     if message.command[0][-2] == "c":
@@ -50,25 +51,23 @@ async def seek_comm(cli, message: Message, _, chat_id):
         n, file_path = await YouTube.video(playing[0]["vidid"], True)
         if n == 0:
             return await message.reply_text(_["admin_22"])
-    check = (playing[0]).get("speed_path")
-    if check:
-        file_path = check
     if "index_" in file_path:
         file_path = playing[0]["vidid"]
+    speed = (playing[0]).get("speed")
     try:
-        await Hotty.seek_stream(
-            chat_id,
-            file_path,
-            seconds_to_min(to_seek),
-            duration,
-            playing[0]["streamtype"],
-        )
+        if speed and float(speed) != 1.0:
+            await Hotty.speedup_stream(chat_id, file_path, speed, playing, to_seek)
+        else:
+            await Hotty.seek_stream(
+                chat_id,
+                file_path,
+                seconds_to_min(to_seek),
+                duration,
+                playing[0]["streamtype"],
+            )
     except:
         return await mystic.edit_text(_["admin_26"], reply_markup=close_markup(_))
-    if message.command[0][-2] == "c":
-        db[chat_id][0]["played"] -= duration_to_skip
-    else:
-        db[chat_id][0]["played"] += duration_to_skip
+    clock.seek(chat_id, to_seek)
     await mystic.edit_text(
         text=_["admin_25"].format(seconds_to_min(to_seek), message.from_user.mention),
         reply_markup=close_markup(_),
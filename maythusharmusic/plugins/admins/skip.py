@@ -9,7 +9,9 @@ from maythusharmusic.utils.database import get_loop
 from maythusharmusic.utils.decorators import AdminRightsCheck
 from maythusharmusic.utils.inline import close_markup, stream_markup
 from maythusharmusic.utils.stream.autoclear import auto_clean
-from maythusharmusic.utils.thumbnails import get_thumb
+from maythusharmusic.utils.stream import clock
+from maythusharmusic.utils.stream.prefetch import prefetch_next
+from maythusharmusic.utils.thumbnails import get_thumb, remember_thumb
 from config import BANNED_USERS
 
 
@@ -89,17 +91,15 @@ async def skip(cli, message: Message, _, chat_id):
                 return await Hotty.stop_stream(chat_id)
             except:
                 return
+    prefetch_next(chat_id)
     queued = check[0]["file"]
     title = (check[0]["title"]).title()
     user = check[0]["by"]
     streamtype = check[0]["streamtype"]
     videoid = check[0]["vidid"]
     status = True if str(streamtype) == "video" else None
-    db[chat_id][0]["played"] = 0
-    exis = (check[0]).get("old_dur")
-    if exis:
-        db[chat_id][0]["dur"] = exis
-        db[chat_id][0]["seconds"] = check[0]["old_second"]
+    clock.start(chat_id)
+    if (check[0]).get("speed"):
         db[chat_id][0]["speed_path"] = None
         db[chat_id][0]["speed"] = 1.0
     if "live_" in queued:
@@ -127,6 +127,7 @@ async def skip(cli, message: Message, _, chat_id):
             reply_markup=InlineKeyboardMarkup(button),
         )
         db[chat_id][0]["mystic"] = run
+        remember_thumb(videoid, run)
         db[chat_id][0]["markup"] = "tg"
     elif "vid_" in queued:
         mystic = await message.reply_text(_["call_7"], disable_web_page_preview=True)
@@ -160,6 +161,7 @@ async def skip(cli, message: Message, _, chat_id):
             reply_markup=InlineKeyboardMarkup(button),
         )
         db[chat_id][0]["mystic"] = run
+        remember_thumb(videoid, run)
         db[chat_id][0]["markup"] = "stream"
         await mystic.delete()
     elif "index_" in queued:
@@ -229,4 +231,5 @@ async def skip(cli, message: Message, _, chat_id):
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            remember_thumb(videoid, run)
             db[chat_id][0]["markup"] = "stream"
@@ -1,10 +1,35 @@
 import time, re
+from collections import OrderedDict
 from pyrogram.enums import MessageEntityType
 from pyrogram import filters
 from pyrogram.types import Message
 from maythusharmusic import app
 from maythusharmusic.mongo.readable_time import get_readable_time
-from maythusharmusic.mongo.afkdb import add_afk, is_afk, remove_afk
+from maythusharmusic.mongo.afkdb import add_afk, afk_users, is_afk, remove_afk
+
+USERNAME_CACHE_SIZE = 10000
+# lowercased username -> (user_id, first_name), used to resolve @mentions
+username_cache = OrderedDict()
+
+
+def cache_username(user):
+    if not user or not user.username:
+        return
+    key = user.username.lower()
+    username_cache[key] = (user.id, user.first_name)
+    username_cache.move_to_end(key)
+    while len(username_cache) > USERNAME_CACHE_SIZE:
+        username_cache.popitem(last=False)
+
+
+async def resolve_username(username):
+    key = username.lower()
+    if key in username_cache:
+        username_cache.move_to_end(key)
+        return username_cache[key]
+    user = await app.get_users(username)
+    cache_username(user)
+    return user.id, user.first_name
 
 
 @app.on_message(filters.command(["afk", "brb"], prefixes=["/", "!"]))
@@ -169,6 +194,7 @@ async def chat_watcher_func(_, message):
         return
     userid = message.from_user.id
     user_name = message.from_user.first_name
+    cache_username(message.from_user)
     if message.entities:
         possible = ["/afk", f"/afk@{app.username}"]
         message_text = message.text or message.caption
@@ -218,7 +244,8 @@ async def chat_watcher_func(_, message):
         except:
             msg += f"**{user_name[:25]}** ɪs ʙᴀᴄᴋ ᴏɴʟɪɴᴇ\n\n"
 
-    if message.reply_to_message:
+    # Nobody else is afk, so there is nothing to look up for replies or mentions.
+    if message.reply_to_message and afk_users:
         try:
             replied_first_name = message.reply_to_message.from_user.first_name
             replied_user_id = message.reply_to_message.from_user.id
@@ -263,7 +290,7 @@ async def chat_watcher_func(_, message):
         except:
             pass
 
-    if message.entities:
+    if message.entities and afk_users:
         entity = message.entities
         j = 0
         for x in range(len(entity)):
@@ -271,14 +298,14 @@ async def chat_watcher_func(_, message):
                 found = re.findall("@([_0-9a-zA-Z]+)", message.text)
                 try:
                     get_user = found[j]
-                    user = await app.get_users(get_user)
-                    if user.id == replied_user_id:
+                    mention_id, mention_name = await resolve_username(get_user)
+                    if mention_id == replied_user_id:
                         j += 1
                         continue
                 except:
                     j += 1
                     continue
-                verifier, reasondb = await is_afk(user.id)
+                verifier, reasondb = await is_afk(mention_id)
                 if verifier:
                     try:
                         afktype = reasondb["type"]
@@ -288,34 +315,34 @@ async def chat_watcher_func(_, message):
                         seenago = get_readable_time((int(time.time() - timeafk)))
                         if afktype == "text":
                             msg += (
-                                f"**{user.first_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\n"
+                                f"**{mention_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\n"
                             )
                         if afktype == "text_reason":
-                            msg += f"**{user.first_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\nʀᴇᴀsᴏɴ: `{reasonafk}`\n\n"
+                            msg += f"**{mention_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\nʀᴇᴀsᴏɴ: `{reasonafk}`\n\n"
                         if afktype == "animation":
                             if str(reasonafk) == "None":
                                 send = await message.reply_animation(
                                     data,
-                                    caption=f"**{user.first_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\n",
+                                    caption=f"**{mention_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\n",
                                 )
                             else:
                                 send = await message.reply_animation(
                                     data,
-                                    caption=f"**{user.first_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\nʀᴇᴀsᴏɴ: `{reasonafk}`\n\n",
+                                    caption=f"**{mention_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\nʀᴇᴀsᴏɴ: `{reasonafk}`\n\n",
                                 )
                         if afktype == "photo":
                             if str(reasonafk) == "None":
                                 send = await message.reply_photo(
-                                    photo=f"downloads/{user.id}.jpg",
-                                    caption=f"**{user.first_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\n",
+                                    photo=f"downloads/{mention_id}.jpg",
+                                    caption=f"**{mention_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\n",
                                 )
                             else:
                                 send = await message.reply_photo(
-                                    photo=f"downloads/{user.id}.jpg",
-                                    caption=f"**{user.first_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\nʀᴇᴀsᴏɴ: `{reasonafk}`\n\n",
+                                    photo=f"downloads/{mention_id}.jpg",
+                                    caption=f"**{mention_name[:25]}** ɪs ᴀғᴋ sɪɴᴄᴇ {seenago}\n\nʀᴇᴀsᴏɴ: `{reasonafk}`\n\n",
                                 )
                     except:
-                        msg += f"**{user.first_name[:25]}** ɪs ᴀғᴋ\n\n"
+                        msg += f"**{mention_name[:25]}** ɪs ᴀғᴋ\n\n"
             elif (entity[j].type) == MessageEntityType.TEXT_MENTION:
                 try:
                     user_id = entity[j].user.id
@@ -1,6 +1,5 @@
 import os
 import re
-import yt_dlp
 from pyrogram import Client, filters
 from pyrogram.types import (
     CallbackQuery,
@@ -207,8 +206,10 @@ async def song_download_cb(client, callback_query: CallbackQuery, _) :
     stype, format_id, vidid = callback_request.split("|")
     mystic = await callback_query.edit_message_text(_["song_8"])
     yturl = f"https://www.youtube.com/watch?v={vidid}"
-    with yt_dlp.YoutubeDL({"quiet": True}) as ytdl:
-        x = ytdl.extract_info(yturl, download=False)
+    try:
+        x = await YouTube.info(vidid, True)
+    except Exception as e:
+        return await mystic.edit_text(_["song_9"].format(e))
     title = (x["title"]).title()
     title = re.sub("\W+", " ", title)
     thumb_image_path = await callback_query.message.download()
@@ -224,6 +225,7 @@ async def song_download_cb(client, callback_query: CallbackQuery, _) :
                 songvideo=True,
                 format_id=format_id,
                 title=title,
+                info=x,
             )
         except Exception as e:
             return await mystic.edit_text(_["song_9"].format(e))
@@ -255,6 +257,7 @@ async def song_download_cb(client, callback_query: CallbackQuery, _) :
                 songaudio=True,
                 format_id=format_id,
                 title=title,
+                info=x,
             )
         except Exception as e:
             return await mystic.edit_text(_["song_9"].format(e))
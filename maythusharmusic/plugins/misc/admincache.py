@@ -0,0 +1,17 @@
+import asyncio
+
+from pyrogram.types import ChatMemberUpdated
+
+from maythusharmusic import app
+from maythusharmusic.utils.admincache import admin_refresher, member_updated
+
+
+@app.on_chat_member_updated(group=3)
+async def admin_changed(_, update: ChatMemberUpdated):
+    member = update.new_chat_member or update.old_chat_member
+    if not member or not member.user:
+        return
+    member_updated(update.chat.id, member.user.id, update.new_chat_member)
+
+
+asyncio.create_task(admin_refresher())
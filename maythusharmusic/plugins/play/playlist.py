@@ -7,12 +7,13 @@ from typing import Dict, List, Union
 
 import requests
 from pykeyboard import InlineKeyboard
+from pymongo import UpdateOne
 from pyrogram import filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 from youtube_search import YoutubeSearch
 
 from config import BANNED_USERS, SERVER_PLAYLIST_LIMIT
-from maythusharmusic import Carbon, app
+from maythusharmusic import LOGGER, Carbon, app
 from maythusharmusic.utils.decorators.language import language, languageCB
 from maythusharmusic.utils.inline.playlist import (
     botplaylist_markup,
@@ -31,54 +32,124 @@ SPAM_WINDOW_SECONDS = 5
 from maythusharmusic.core.mongo import mongodb
 
 playlistdb = mongodb.playlist
+# One document per (chat_id, videoid) with its title, duration and position.
+playlistitemsdb = mongodb.playlistitems
 playlist = []
 # Playlist Databse
 
 
-async def _get_playlists(chat_id: int) -> Dict[str, int]:
-    _notes = await playlistdb.find_one({"chat_id": chat_id})
-    if not _notes:
-        return {}
-    return _notes["notes"]
+def _old_notes(old: dict) -> List[dict]:
+    notes = []
+    for videoid, note in (old.get("notes") or {}).items():
+        if not isinstance(note, dict) or "title" not in note or "duration" not in note:
+            LOGGER(__name__).warning(
+                f"Skipping malformed playlist entry {videoid} of {old.get('chat_id')}"
+            )
+            continue
+        notes.append({**note, "videoid": note.get("videoid") or videoid})
+    return notes
+
+
+async def migrate_playlists():
+    # Older versions kept every entry of a user in a single {"notes": {...}} document.
+    try:
+        async for old in playlistdb.find({"notes": {"$exists": True}}):
+            try:
+                await save_playlists(old["chat_id"], _old_notes(old))
+                await playlistdb.delete_one({"_id": old["_id"]})
+            except Exception as e:
+                LOGGER(__name__).warning(
+                    f"Migrating the playlist of {old.get('chat_id')} failed: {e}"
+                )
+    except Exception as e:
+        LOGGER(__name__).warning(f"Migrating playlists failed: {e}")
+
+
+async def _next_position(chat_id: int) -> int:
+    last = await playlistitemsdb.find_one(
+        {"chat_id": chat_id}, sort=[("position", -1)], projection={"position": 1}
+    )
+    if not last:
+        return 0
+    return last["position"] + 1
+
+
+def _entry(item: dict) -> dict:
+    return {
+        "videoid": item["videoid"],
+        "title": item["title"],
+        "duration": item["duration"],
+    }
+
+
+async def count_playlist(chat_id: int) -> int:
+    return await playlistitemsdb.count_documents({"chat_id": chat_id})
+
+
+async def get_playlist_items(chat_id: int, skip: int = 0, limit: int = 0) -> List[dict]:
+    cursor = playlistitemsdb.find({"chat_id": chat_id}).sort("position", 1).skip(skip)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [_entry(item) async for item in cursor]
 
 
 async def get_playlist_names(chat_id: int) -> List[str]:
-    _notes = []
-    for note in await _get_playlists(chat_id):
-        _notes.append(note)
-    return _notes
+    cursor = playlistitemsdb.find(
+        {"chat_id": chat_id}, projection={"videoid": 1}
+    ).sort("position", 1)
+    return [item["videoid"] async for item in cursor]
 
 
 async def get_playlist(chat_id: int, name: str) -> Union[bool, dict]:
-    name = name
-    _notes = await _get_playlists(chat_id)
-    if name in _notes:
-        return _notes[name]
-    else:
+    item = await playlistitemsdb.find_one({"chat_id": chat_id, "videoid": name})
+    if not item:
         return False
+    return _entry(item)
 
 
 async def save_playlist(chat_id: int, name: str, note: dict):
-    name = name
-    _notes = await _get_playlists(chat_id)
-    _notes[name] = note
-    await playlistdb.update_one(
-        {"chat_id": chat_id}, {"$set": {"notes": _notes}}, upsert=True
+    await playlistitemsdb.update_one(
+        {"chat_id": chat_id, "videoid": name},
+        {
+            "$set": {"title": note["title"], "duration": note["duration"]},
+            "$setOnInsert": {"position": await _next_position(chat_id)},
+        },
+        upsert=True,
     )
 
 
-async def delete_playlist(chat_id: int, name: str) -> bool:
-    notesd = await _get_playlists(chat_id)
-    name = name
-    if name in notesd:
-        del notesd[name]
-        await playlistdb.update_one(
-            {"chat_id": chat_id},
-            {"$set": {"notes": notesd}},
+async def save_playlists(chat_id: int, notes: List[dict]):
+    if not notes:
+        return
+    position = await _next_position(chat_id)
+    operations = [
+        UpdateOne(
+            {"chat_id": chat_id, "videoid": note["videoid"]},
+            {
+                "$set": {"title": note["title"], "duration": note["duration"]},
+                "$setOnInsert": {"position": position + count},
+            },
             upsert=True,
         )
-        return True
-    return False
+        for count, note in enumerate(notes)
+    ]
+    await playlistitemsdb.bulk_write(operations, ordered=False)
+
+
+async def delete_playlist(chat_id: int, name: str) -> bool:
+    deleted = await playlistitemsdb.delete_one({"chat_id": chat_id, "videoid": name})
+    return deleted.deleted_count > 0
+
+
+async def delete_playlists(chat_id: int, names: List[str] = None) -> int:
+    query = {"chat_id": chat_id}
+    if names is not None:
+        query["videoid"] = {"$in": names}
+    deleted = await playlistitemsdb.delete_many(query)
+    return deleted.deleted_count
+
+
+asyncio.create_task(migrate_playlists())
 
 
 # Command
@@ -112,15 +183,14 @@ async def check_playlist(client, message: Message, _):
         user_command_count[user_id] = 1
         user_last_message_time[user_id] = current_time
 
-    _playlist = await get_playlist_names(message.from_user.id)
+    _playlist = await get_playlist_items(message.from_user.id)
     if _playlist:
         get = await message.reply_text(_["playlist_2"])
     else:
         return await message.reply_text(_["playlist_3"])
     msg = _["playlist_4"]
     count = 0
-    for shikhar in _playlist:
-        _note = await get_playlist(message.from_user.id, shikhar)
+    for _note in _playlist:
         title = _note["title"]
         title = title.title()
         duration = _note["duration"]
@@ -140,16 +210,15 @@ async def check_playlist(client, message: Message, _):
 
 async def get_keyboard(_, user_id):
     keyboard = InlineKeyboard(row_width=5)
-    _playlist = await get_playlist_names(user_id)
+    _playlist = await get_playlist_items(user_id, limit=SERVER_PLAYLIST_LIMIT)
     count = len(_playlist)
-    for x in _playlist:
-        _note = await get_playlist(user_id, x)
+    for _note in _playlist:
         title = _note["title"]
         title = title.title()
         keyboard.row(
             InlineKeyboardButton(
                 text=title,
-                callback_data=f"del_playlist {x}",
+                callback_data=f"del_playlist {_note['videoid']}",
             )
         )
     keyboard.row(
@@ -187,7 +256,7 @@ async def del_plist_msg(client, message: Message, _):
         user_command_count[user_id] = 1
         user_last_message_time[user_id] = current_time
 
-    _playlist = await get_playlist_names(message.from_user.id)
+    _playlist = await count_playlist(message.from_user.id)
     if _playlist:
         get = await message.reply_text(_["playlist_2"])
     else:
@@ -326,6 +395,7 @@ async def add_playlist(client, message: Message, _):
             )
 
         user_id = message.from_user.id
+        plists = []
         for video_url in video_urls:
             video_id = video_url.split("v=")[-1]
 
@@ -342,7 +412,7 @@ async def add_playlist(client, message: Message, _):
                 "duration": duration,
             }
 
-            await save_playlist(user_id, video_id, plist)
+            plists.append(plist)
             keyboardes = InlineKeyboardMarkup(
                 [
                     [
@@ -353,6 +423,7 @@ async def add_playlist(client, message: Message, _):
                     ]
                 ]
             )
+        await save_playlists(user_id, plists)
         await adding.delete()
         return await message.reply_text(
             text="**➻ ᴀʟʟ sᴏɴɢs ʜᴀs ʙᴇᴇɴ ᴀᴅᴅᴇᴅ sᴜᴄᴄᴇssғᴜʟʟʏ ғʀᴏᴍ ʏᴏᴜʀ ʏᴏᴜᴛᴜʙᴇ ᴘʟᴀʏʟɪsᴛ ʟɪɴᴋ✅**\n\n**➥ ɪғ ʏᴏᴜ ᴡᴀɴᴛ ᴛᴏ ʀᴇᴍᴏᴠᴇ ᴀɴʏ sᴏɴɢ ᴛʜᴇɴ ᴄʟɪᴄᴋ ɢɪᴠᴇɴ ʙᴇʟᴏᴡ ʙᴜᴛᴛᴏɴ.\n\n**▷ ᴄʜᴇᴄᴋ ʙʏ » /playlist**\n\n▷ **ᴘʟᴀʏ ʙʏ » /play**",
@@ -380,6 +451,7 @@ async def add_playlist(client, message: Message, _):
             )
 
         user_id = message.from_user.id
+        plists = []
         for video_url in video_urls:
             videosid = query.split("/")[-1].split("?")[0]
 
@@ -396,7 +468,7 @@ async def add_playlist(client, message: Message, _):
                 "duration": duration,
             }
 
-            await save_playlist(user_id, video_id, plist)
+            plists.append(plist)
             keyboardes = InlineKeyboardMarkup(
                 [
                     [
@@ -407,6 +479,7 @@ async def add_playlist(client, message: Message, _):
                     ]
                 ]
             )
+        await save_playlists(user_id, plists)
         await addin.delete()
         return await message.reply_text(
             text="**➻ ᴀʟʟ sᴏɴɢs ʜᴀs ʙᴇᴇɴ ᴀᴅᴅᴇᴅ sᴜᴄᴄᴇssғᴜʟʟʏ ғʀᴏᴍ ʏᴏᴜʀ ʏᴏᴜᴛᴜʙᴇ channel ʟɪɴᴋ✅**\n\n**➥ ɪғ ʏᴏᴜ ᴡᴀɴᴛ ᴛᴏ ʀᴇᴍᴏᴠᴇ ᴀɴʏ sᴏɴɢ ᴛʜᴇɴ ᴄʟɪᴄᴋ ɢɪᴠᴇɴ ʙᴇʟᴏᴡ ʙᴜᴛᴛᴏɴ.\n\n**▷ ᴄʜᴇᴄᴋ ʙʏ » /playlist**\n\n▷ **ᴘʟᴀʏ ʙʏ » /play**",
@@ -433,8 +506,7 @@ async def add_playlist(client, message: Message, _):
                 except KeyError:
                     pass
 
-            _count = await get_playlist_names(user_id)
-            count = len(_count)
+            count = await count_playlist(user_id)
             if count == SERVER_PLAYLIST_LIMIT:
                 try:
                     return await message.reply_text(
@@ -506,8 +578,7 @@ async def add_playlist(client, message: Message, _):
                 except KeyError:
                     pass
 
-            _count = await get_playlist_names(user_id)
-            count = len(_count)
+            count = await count_playlist(user_id)
             if count == SERVER_PLAYLIST_LIMIT:
                 try:
                     return await message.reply_text(
@@ -554,7 +625,7 @@ async def add_playlist(client, message: Message, _):
 @app.on_callback_query(filters.regex("open_playlist") & ~BANNED_USERS)
 @languageCB
 async def open_playlist(client, CallbackQuery, _):
-    _playlist = await get_playlist_names(CallbackQuery.from_user.id)
+    _playlist = await count_playlist(CallbackQuery.from_user.id)
     if _playlist:
         get = await CallbackQuery.message.edit_text(_["playlist_2"])
     else:
@@ -609,8 +680,7 @@ async def add_playlist(client, CallbackQuery, _):
             return await CallbackQuery.answer(_["playlist_8"], show_alert=True)
         except:
             return
-    _count = await get_playlist_names(user_id)
-    count = len(_count)
+    count = await count_playlist(user_id)
     if count == SERVER_PLAYLIST_LIMIT:
         try:
             return await CallbackQuery.answer(
@@ -677,8 +747,7 @@ async def add_playlists(client, CallbackQuery, _):
             return await CallbackQuery.answer(_["playlist_8"], show_alert=True)
         except:
             return
-    _count = await get_playlist_names(user_id)
-    count = len(_count)
+    count = await count_playlist(user_id)
     if count == SERVER_PLAYLIST_LIMIT:
         try:
             return await CallbackQuery.answer(
@@ -720,7 +789,7 @@ async def delete_all_playlists(client, message, _):
     pass
 
     user_id = message.from_user.id
-    _playlist = await get_playlist_names(user_id)
+    _playlist = await count_playlist(user_id)
     if _playlist:
         try:
             upl = warning_markup(_)
@@ -759,12 +828,11 @@ async def del_plist(client, CallbackQuery, _):
 async def del_whole_playlist(client, CallbackQuery, _):
     pass
 
-    _playlist = await get_playlist_names(CallbackQuery.from_user.id)
-    for x in _playlist:
+    if await count_playlist(CallbackQuery.from_user.id):
         await CallbackQuery.answer(
             "➻ ᴏᴋ sɪʀ ᴘʟᴇᴀsᴇ ᴡᴀɪᴛ.\n\n➥ ᴅᴇʟᴇᴛɪɴɢ ʏᴏᴜʀ ᴘʟᴀʏʟɪsᴛ...", show_alert=True
         )
-        await delete_playlist(CallbackQuery.from_user.id, x)
+        await delete_playlists(CallbackQuery.from_user.id)
     return await CallbackQuery.edit_message_text(_["playlist_13"])
 
 
@@ -815,7 +883,7 @@ async def del_back_playlist(client, CallbackQuery, _):
     pass
 
     user_id = CallbackQuery.from_user.id
-    _playlist = await get_playlist_names(user_id)
+    _playlist = await count_playlist(user_id)
     if _playlist:
         try:
             await CallbackQuery.answer(_["playlist_2"], show_alert=True)
@@ -10,10 +10,11 @@ from pyrogram.errors import (
 )
 from pyrogram.types import Message
 
-from config import BANNED_USERS, adminlist
+from config import BANNED_USERS
 from strings import get_string
 from maythusharmusic import app
 from maythusharmusic.misc import SUDOERS
+from maythusharmusic.utils.admincache import get_admins
 from maythusharmusic.utils.database import (
     get_assistant,
     get_cmode,
@@ -132,7 +133,7 @@ async def radio(client, message: Message):
         playty = await get_playtype(message.chat.id)
         if playty != "Everyone":
             if message.from_user.id not in SUDOERS:
-                admins = adminlist.get(message.chat.id)
+                admins = await get_admins(message.chat.id)
                 if not admins:
                     return await message.reply_text(_["admin_18"])
                 else:
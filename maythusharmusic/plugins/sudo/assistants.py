@@ -0,0 +1,35 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from maythusharmusic import app
+from maythusharmusic.core.userbot import assistants
+from maythusharmusic.misc import SUDOERS
+from maythusharmusic.utils import balancer
+from maythusharmusic.utils.database import (
+    assistantdict,
+    get_active_chats,
+    rebalance_assistants,
+)
+
+
+@app.on_message(filters.command("assistants") & SUDOERS)
+async def assistants_load(_, message: Message):
+    text = ""
+    if len(message.command) > 1 and message.command[1].lower() == "rebalance":
+        moved = await rebalance_assistants()
+        text += f"<b>ᴜɴᴀssɪɢɴᴇᴅ ɪᴅʟᴇ ᴄʜᴀᴛs :</b> <code>{moved}</code>\n\n"
+    active = await get_active_chats()
+    counts = balancer.loads(assistants, active, assistantdict)
+    text += "<b><u>ᴀssɪsᴛᴀɴᴛs :</u></b>\n"
+    for number in assistants:
+        state = "ʜᴇᴀʟᴛʜʏ" if balancer.is_healthy(number) else "ᴜɴʜᴇᴀʟᴛʜʏ"
+        failed = len(balancer.failures.get(number, ()))
+        text += (
+            f"\n<b>{number} :</b> <code>{counts[number]}</code> ᴄᴀʟʟs, "
+            f"<code>{failed}</code> ғᴀɪʟᴇᴅ ᴊᴏɪɴs, {state}"
+        )
+        flood = balancer.flood_left(number)
+        if flood:
+            text += f", ғʟᴏᴏᴅᴡᴀɪᴛ <code>{flood}s</code>"
+    text += "\n\n<code>/assistants rebalance</code> ᴍᴏᴠᴇs ɪᴅʟᴇ ᴄʜᴀᴛs ᴏғғ ʙᴜsʏ ᴀssɪsᴛᴀɴᴛs."
+    await message.reply_text(text)
@@ -0,0 +1,86 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from maythusharmusic import app
+from maythusharmusic.misc import SUDOERS
+from maythusharmusic.platforms.Youtube import (
+    download_stats,
+    stream_url_stats,
+    stream_urls,
+)
+from maythusharmusic.plugins.admins.callback import timer_stats
+from maythusharmusic.utils import extractor, mediacache, mediainfo
+from maythusharmusic.utils.database import settings_cache, settings_stats
+from maythusharmusic.utils.formatters import convert_bytes
+from maythusharmusic.utils.stream import playback
+from maythusharmusic.utils.thumbnails import render_stats, thumb_file_ids
+
+POOL_NAMES = {"extract": "ᴇxᴛʀᴀᴄᴛ", "download": "ᴅᴏᴡɴʟᴏᴀᴅ"}
+
+
+@app.on_message(filters.command("cachestats") & SUDOERS)
+async def cache_stats(_, message: Message):
+    text = (
+        "<b><u>ᴍᴇᴅɪᴀ ᴄᴀᴄʜᴇ :</u></b>\n"
+        f"<b>ғɪʟᴇs :</b> <code>{len(mediacache.index)}</code>\n"
+        f"<b>sɪᴢᴇ :</b> <code>{convert_bytes(mediacache.total_size()) or '0 B'}</code>\n"
+        f"<b>ʜɪᴛs :</b> <code>{mediacache.stats['hits']}</code>\n"
+        f"<b>ᴍɪssᴇs :</b> <code>{mediacache.stats['misses']}</code>\n"
+        f"<b>ᴇᴠɪᴄᴛᴇᴅ :</b> <code>{mediacache.stats['evicted']}</code>\n\n"
+        "<b><u>ᴅᴏᴡɴʟᴏᴀᴅs :</u></b>\n"
+        f"<b>sᴛᴀʀᴛᴇᴅ :</b> <code>{download_stats['started']}</code>\n"
+        f"<b>ᴄᴏᴀʟᴇsᴄᴇᴅ :</b> <code>{download_stats['coalesced']}</code>\n\n"
+        "<b><u>ʏᴛ-ᴅʟᴘ :</u></b>\n"
+        f"<b>sᴛʀᴇᴀᴍ ᴜʀʟs :</b> <code>{len(stream_urls)}</code>\n"
+        f"<b>ᴜʀʟ ʜɪᴛs :</b> <code>{stream_url_stats['hits']}</code>\n"
+        f"<b>ᴜʀʟ ᴍɪssᴇs :</b> <code>{stream_url_stats['misses']}</code>\n"
+        f"<b>ʀᴇғʀᴇsʜᴇᴅ :</b> <code>{stream_url_stats['refreshed']}</code>\n"
+    )
+    for name, stats in extractor.pool_stats.items():
+        text += (
+            f"\n<b>{POOL_NAMES[name]} :</b>\n"
+            f"<b>ᴄᴀʟʟs :</b> <code>{stats['calls']}</code>\n"
+            f"<b>ᴇʀʀᴏʀs :</b> <code>{stats['errors']}</code>\n"
+            f"<b>ᴛɪᴍᴇᴏᴜᴛs :</b> <code>{stats['timeouts']}</code>\n"
+            f"<b>ʀᴇᴄʏᴄʟᴇᴅ :</b> <code>{stats['recycled']}</code>\n"
+        )
+        for bucket, hits in stats["histogram"].items():
+            label = f"≤ {bucket}ms" if bucket != "inf" else "> 10000ms"
+            text += f"<code>{label} : {hits}</code>\n"
+    text += (
+        "\n<b><u>ᴛʜᴜᴍʙɴᴀɪʟs :</u></b>\n"
+        f"<b>ʀᴇɴᴅᴇʀᴇᴅ :</b> <code>{render_stats['rendered']}</code>\n"
+        f"<b>ᴄᴏᴀʟᴇsᴄᴇᴅ :</b> <code>{render_stats['coalesced']}</code>\n"
+        f"<b>ᴅʀᴏᴘᴘᴇᴅ :</b> <code>{render_stats['dropped']}</code>\n"
+        f"<b>ᴇᴠɪᴄᴛᴇᴅ :</b> <code>{render_stats['evicted']}</code>\n"
+        f"<b>ғɪʟᴇ ɪᴅs :</b> <code>{len(thumb_file_ids)}</code>\n"
+    )
+    for bucket, hits in render_stats["histogram"].items():
+        label = f"≤ {bucket}ms" if bucket != "inf" else "> 5000ms"
+        text += f"<code>{label} : {hits}</code>\n"
+    text += (
+        "\n<b><u>ᴘʀᴏɢʀᴇss ʙᴀʀ :</u></b>\n"
+        f"<b>ᴛɪᴄᴋs :</b> <code>{timer_stats['ticks']}</code>\n"
+        f"<b>ᴇᴅɪᴛs :</b> <code>{timer_stats['edits']}</code>\n"
+        f"<b>sᴋɪᴘᴘᴇᴅ :</b> <code>{timer_stats['skipped']}</code>\n"
+        f"<b>ғʟᴏᴏᴅᴡᴀɪᴛs :</b> <code>{timer_stats['floodwaits']}</code>\n"
+        f"<b>ʟᴀsᴛ ᴛɪᴄᴋ :</b> <code>{timer_stats['last_tick']:.2f}s</code>\n"
+        f"<b>sʟᴏᴡᴇsᴛ ᴛɪᴄᴋ :</b> <code>{timer_stats['max_tick']:.2f}s</code>\n"
+        f"<b>ʙᴇʜɪɴᴅ :</b> <code>{timer_stats['lag']:.2f}s</code>\n\n"
+        "<b><u>sᴇᴛᴛɪɴɢs :</u></b>\n"
+        f"<b>ᴇɴᴛʀɪᴇs :</b> <code>{len(settings_cache)}</code>\n"
+        f"<b>ʜɪᴛs :</b> <code>{settings_stats['hits']}</code>\n"
+        f"<b>ᴍɪssᴇs :</b> <code>{settings_stats['misses']}</code>\n"
+        f"<b>ɪɴᴠᴀʟɪᴅᴀᴛᴇᴅ :</b> <code>{settings_stats['invalidated']}</code>\n\n"
+        "<b><u>sᴘᴇᴇᴅ :</u></b>\n"
+        f"<b>ʟɪᴠᴇ :</b> <code>{playback.stats['live']}</code>\n"
+        f"<b>ʀᴇɴᴅᴇʀᴇᴅ :</b> <code>{playback.stats['rendered']}</code>\n"
+        f"<b>ʀᴇᴜsᴇᴅ :</b> <code>{playback.stats['reused']}</code>\n"
+        f"<b>ᴇᴠɪᴄᴛᴇᴅ :</b> <code>{playback.stats['evicted']}</code>\n\n"
+        "<b><u>ᴅᴜʀᴀᴛɪᴏɴs :</u></b>\n"
+        f"<b>ᴇɴᴛʀɪᴇs :</b> <code>{len(mediainfo.durations)}</code>\n"
+        f"<b>ʜɪᴛs :</b> <code>{mediainfo.probe_stats['hits']}</code>\n"
+        f"<b>ᴘᴀʀsᴇᴅ :</b> <code>{mediainfo.probe_stats['parsed']}</code>\n"
+        f"<b>ғғᴘʀᴏʙᴇ :</b> <code>{mediainfo.probe_stats['ffprobe']}</code>\n"
+    )
+    await message.reply_text(text)
@@ -0,0 +1,21 @@
+from pyrogram import filters
+from pyrogram.types import Message
+
+from maythusharmusic import app
+from maythusharmusic.misc import SUDOERS
+from maythusharmusic.utils.database.schema import audit_queries
+
+
+@app.on_message(filters.command("dbaudit") & SUDOERS)
+async def db_audit(_, message: Message):
+    mystic = await message.reply_text("ᴇxᴘʟᴀɪɴɪɴɢ ʜᴏᴛ ǫᴜᴇʀɪᴇs...")
+    results = await audit_queries()
+    scans = [name for name, stage in results.items() if stage == "COLLSCAN"]
+    text = "<b><u>ᴅᴀᴛᴀʙᴀsᴇ ᴀᴜᴅɪᴛ :</u></b>\n\n"
+    for name, stage in results.items():
+        text += f"<b>{name} :</b> <code>{stage}</code>\n"
+    if scans:
+        text += f"\n<b>ᴄᴏʟʟsᴄᴀɴ :</b> <code>{', '.join(scans)}</code>"
+    else:
+        text += "\n<b>ᴀʟʟ ʜᴏᴛ ǫᴜᴇʀɪᴇs ᴜsᴇ ᴀɴ ɪɴᴅᴇx.</b>"
+    await mystic.edit_text(text)
@@ -12,6 +12,7 @@ from maythusharmusic.utils import HottyBin, get_channeplayCB, seconds_to_min
 from maythusharmusic.utils.database import get_cmode, is_active_chat, is_music_playing
 from maythusharmusic.utils.decorators.language import language, languageCB
 from maythusharmusic.utils.inline import queue_back_markup, queue_markup
+from maythusharmusic.utils.stream import clock
 from config import BANNED_USERS
 
 basic = {}
@@ -92,7 +93,7 @@ async def get_queue(client, message: Message, _):
             DUR,
             "c" if cplay else "g",
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(clock.get_played(chat_id)),
             got[0]["dur"],
         )
     )
@@ -111,7 +112,7 @@ async def get_queue(client, message: Message, _):
                                     DUR,
                                     "c" if cplay else "g",
                                     videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
+                                    seconds_to_min(clock.get_played(chat_id)),
                                     db[chat_id][0]["dur"],
                                 )
                                 await mystic.edit_reply_markup(reply_markup=buttons)
@@ -232,7 +233,7 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
             DUR,
             cplay,
             videoid,
-            seconds_to_min(got[0]["played"]),
+            seconds_to_min(clock.get_played(chat_id)),
             got[0]["dur"],
         )
     )
@@ -253,7 +254,7 @@ async def queue_back(client, CallbackQuery: CallbackQuery, _):
                                     DUR,
                                     cplay,
                                     videoid,
-                                    seconds_to_min(db[chat_id][0]["played"]),
+                                    seconds_to_min(clock.get_played(chat_id)),
                                     db[chat_id][0]["dur"],
                                 )
                                 await mystic.edit_reply_markup(reply_markup=buttons)
@@ -0,0 +1,115 @@
+import asyncio
+import time
+
+from pyrogram.enums import ChatMembersFilter, ChatMemberStatus
+
+import config
+from config import adminlist
+from maythusharmusic import LOGGER, app
+from maythusharmusic.utils.database import get_active_chats, get_authuser_names
+from maythusharmusic.utils.formatters import alpha_to_int
+
+# chat_id -> monotonic time after which the cached admins are reloaded
+admin_expiry = {}
+# chat_id -> ids that are in adminlist because of /auth rather than admin rights
+auth_admins = {}
+_loading = {}
+
+
+def _can_manage(member) -> bool:
+    if not member or member.status not in (
+        ChatMemberStatus.OWNER,
+        ChatMemberStatus.ADMINISTRATOR,
+    ):
+        return False
+    if member.status == ChatMemberStatus.OWNER:
+        return True
+    return bool(member.privileges and member.privileges.can_manage_video_chats)
+
+
+async def _load_admins(chat_id: int) -> list:
+    admins = []
+    async for user in app.get_chat_members(
+        chat_id, filter=ChatMembersFilter.ADMINISTRATORS
+    ):
+        if _can_manage(user):
+            admins.append(user.user.id)
+    auth = set()
+    for user in await get_authuser_names(chat_id):
+        user_id = await alpha_to_int(user)
+        auth.add(user_id)
+        if user_id not in admins:
+            admins.append(user_id)
+    adminlist[chat_id] = admins
+    auth_admins[chat_id] = auth
+    admin_expiry[chat_id] = time.monotonic() + config.ADMIN_CACHE_TTL
+    return admins
+
+
+async def load_admins(chat_id: int) -> list:
+    if chat_id not in _loading:
+        _loading[chat_id] = asyncio.ensure_future(_load_admins(chat_id))
+        _loading[chat_id].add_done_callback(lambda _: _loading.pop(chat_id, None))
+    return await asyncio.shield(_loading[chat_id])
+
+
+async def get_admins(chat_id: int) -> list:
+    admins = adminlist.get(chat_id)
+    if admins is not None:
+        return admins
+    try:
+        return await load_admins(chat_id)
+    except Exception as e:
+        LOGGER(__name__).warning(f"Loading admins of {chat_id} failed: {e}")
+        return []
+
+
+def add_auth(chat_id: int, user_id: int):
+    admins = adminlist.get(chat_id)
+    if admins is None:
+        return
+    auth_admins.setdefault(chat_id, set()).add(user_id)
+    if user_id not in admins:
+        admins.append(user_id)
+
+
+def remove_auth(chat_id: int, user_id: int):
+    auth_admins.get(chat_id, set()).discard(user_id)
+    admins = adminlist.get(chat_id)
+    if admins and user_id in admins:
+        admins.remove(user_id)
+
+
+def member_updated(chat_id: int, user_id: int, member):
+    admins = adminlist.get(chat_id)
+    if admins is None:
+        return
+    if _can_manage(member):
+        if user_id not in admins:
+            admins.append(user_id)
+    elif user_id in admins and user_id not in auth_admins.get(chat_id, ()):
+        admins.remove(user_id)
+
+
+async def admin_refresher():
+    while not await asyncio.sleep(1):
+        try:
+            now = time.monotonic()
+            active = await get_active_chats()
+            for chat_id in list(adminlist):
+                if chat_id not in active and admin_expiry.get(chat_id, 0) < now:
+                    adminlist.pop(chat_id, None)
+                    admin_expiry.pop(chat_id, None)
+                    auth_admins.pop(chat_id, None)
+            stale = [
+                chat_id
+                for chat_id in active
+                if chat_id in adminlist and admin_expiry.get(chat_id, 0) < now
+            ]
+            for chat_id in stale[: config.ADMIN_REFRESH_RATE]:
+                try:
+                    await load_admins(chat_id)
+                except Exception:
+                    admin_expiry[chat_id] = now + config.ADMIN_CACHE_TTL
+        except Exception:
+            continue
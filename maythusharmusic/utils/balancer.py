@@ -0,0 +1,80 @@
+import random
+import time
+from collections import deque
+
+from pyrogram.errors import FloodWait
+
+import config
+
+# assistant number -> monotonic times of recent failed joins
+failures = {}
+# assistant number -> monotonic time at which its flood wait is over
+floodwaits = {}
+
+
+def _recent_failures(assistant: int, now: float) -> int:
+    recent = failures.get(assistant)
+    if not recent:
+        return 0
+    while recent and recent[0] < now - config.ASSISTANT_FAILURE_WINDOW:
+        recent.popleft()
+    return len(recent)
+
+
+def record_failure(assistant: int, error: Exception = None):
+    if not assistant:
+        return
+    now = time.monotonic()
+    failures.setdefault(assistant, deque()).append(now)
+    wait = getattr(error, "value", None)
+    if isinstance(error, FloodWait) and wait:
+        floodwaits[assistant] = now + int(wait)
+
+
+def flood_left(assistant: int) -> int:
+    return max(0, int(floodwaits.get(assistant, 0) - time.monotonic()))
+
+
+def is_healthy(assistant: int) -> bool:
+    now = time.monotonic()
+    if floodwaits.get(assistant, 0) > now:
+        return False
+    return _recent_failures(assistant, now) < config.ASSISTANT_MAX_FAILURES
+
+
+def loads(assistants: list, active: list, assigned: dict) -> dict:
+    counts = {assistant: 0 for assistant in assistants}
+    for chat_id in active:
+        assistant = assigned.get(chat_id)
+        if assistant in counts:
+            counts[assistant] += 1
+    return counts
+
+
+def pick(assistants: list, active: list, assigned: dict) -> int:
+    now = time.monotonic()
+    candidates = [assistant for assistant in assistants if is_healthy(assistant)]
+    if not candidates:
+        candidates = list(assistants)
+    counts = loads(assistants, active, assigned)
+
+    def cost(assistant):
+        return counts[assistant], _recent_failures(assistant, now)
+
+    best = min(cost(assistant) for assistant in candidates)
+    return random.choice(
+        [assistant for assistant in candidates if cost(assistant) == best]
+    )
+
+
+def overloaded(assistants: list, active: list, assigned: dict) -> list:
+    counts = loads(assistants, active, assigned)
+    healthy = [counts[assistant] for assistant in assistants if is_healthy(assistant)]
+    if not healthy:
+        return []
+    lowest = min(healthy)
+    return [
+        assistant
+        for assistant in assistants
+        if not is_healthy(assistant) or counts[assistant] > lowest + 1
+    ]
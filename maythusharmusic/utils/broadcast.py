@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+from pyrogram.errors import FloodWait
+
+import config
+from maythusharmusic import LOGGER, app
+from maythusharmusic.core.mongo import mongodb
+from maythusharmusic.utils.database import (
+    get_client,
+    get_served_chats,
+    get_served_users,
+)
+
+broadcastdb = mongodb.broadcasts
+JOB_ID = "broadcast"
+BATCH_SIZE = 100
+
+# State of the running broadcast, mirrored to mongo after every finished batch.
+job = {}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if self.paused_until > now:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def is_running() -> bool:
+    return job.get("status") == "running"
+
+
+def cancel() -> bool:
+    if not is_running():
+        return False
+    job["cancelled"] = True
+    return True
+
+
+def new_job(from_chat, message_id, text, chats, users, assistant, pin):
+    job.clear()
+    job.update(
+        {
+            "_id": JOB_ID,
+            "status": "running",
+            "from_chat": from_chat,
+            "message_id": message_id,
+            "text": text,
+            "chats": chats,
+            "users": users,
+            "assistant": assistant,
+            "pin": pin,
+            "cursor": {"chats": None, "users": None},
+            "sent": {"chats": 0, "users": 0},
+            "pinned": 0,
+            "failed": 0,
+            "assistants": {},
+        }
+    )
+    return job
+
+
+async def load_job() -> bool:
+    # A broadcast started after boot owns the job, it is never replaced.
+    if is_running():
+        return False
+    saved = await broadcastdb.find_one({"_id": JOB_ID})
+    if not saved or saved.get("status") != "running" or is_running():
+        return False
+    job.clear()
+    job.update(saved)
+    return True
+
+
+async def _save():
+    state = {key: value for key, value in job.items() if key != "cancelled"}
+    await broadcastdb.replace_one({"_id": JOB_ID}, state, upsert=True)
+
+
+async def _send(client, bucket: TokenBucket, chat_id: int):
+    for attempt in range(config.BROADCAST_RETRIES + 1):
+        if job.get("cancelled"):
+            return
+        await bucket.acquire()
+        try:
+            if job["message_id"]:
+                return await client.forward_messages(
+                    chat_id, job["from_chat"], job["message_id"]
+                )
+            return await client.send_message(chat_id, text=job["text"])
+        except FloodWait as fw:
+            if int(fw.value) > config.BROADCAST_MAX_FLOODWAIT:
+                return
+            # The whole account is limited, so every sender waits, not just this one.
+            bucket.pause(int(fw.value))
+        except (asyncio.TimeoutError, OSError):
+            await asyncio.sleep(2**attempt)
+        except Exception:
+            return
+
+
+async def _run_targets(phase: str, targets: list, bucket: TokenBucket):
+    semaphore = asyncio.Semaphore(config.BROADCAST_CONCURRENCY)
+    cursor = job["cursor"][phase]
+    if cursor is not None:
+        targets = [chat_id for chat_id in targets if chat_id > cursor]
+
+    async def deliver(chat_id):
+        async with semaphore:
+            sent = await _send(app, bucket, chat_id)
+        if not sent:
+            job["failed"] += 1
+            return
+        job["sent"][phase] += 1
+        if phase == "chats" and job["pin"]:
+            try:
+                await sent.pin(disable_notification=job["pin"] != "pinloud")
+                job["pinned"] += 1
+            except:
+                pass
+
+    for start in range(0, len(targets), BATCH_SIZE):
+        if job.get("cancelled"):
+            return
+        batch = targets[start : start + BATCH_SIZE]
+        await asyncio.gather(*(deliver(chat_id) for chat_id in batch))
+        job["cursor"][phase] = batch[-1]
+        await _save()
+
+
+async def _run_assistant(number: int):
+    client = await get_client(number)
+    bucket = TokenBucket(config.BROADCAST_ASSISTANT_RATE, 1)
+    sent = 0
+    async for dialog in client.get_dialogs():
+        if job.get("cancelled"):
+            return
+        if await _send(client, bucket, dialog.chat.id):
+            sent += 1
+    job["assistants"][str(number)] = sent
+    await _save()
+
+
+async def run(report):
+    from maythusharmusic.core.userbot import assistants
+
+    async def reporter():
+        while not await asyncio.sleep(config.BROADCAST_PROGRESS_INTERVAL):
+            try:
+                await report(job)
+            except Exception:
+                pass
+
+    progress = asyncio.create_task(reporter())
+    bucket = TokenBucket(config.BROADCAST_RATE, config.BROADCAST_RATE)
+    failed = False
+    try:
+        await _save()
+        if job["chats"]:
+            chats = sorted(int(chat["chat_id"]) for chat in await get_served_chats())
+            await _run_targets("chats", chats, bucket)
+        if job["users"] and not job.get("cancelled"):
+            users = sorted(int(user["user_id"]) for user in await get_served_users())
+            await _run_targets("users", users, bucket)
+        if job["assistant"] and not job.get("cancelled"):
+            await asyncio.gather(
+                *(
+                    _run_assistant(number)
+                    for number in assistants
+                    if str(number) not in job["assistants"]
+                )
+            )
+    except Exception as e:
+        # The checkpoint stays in mongo, so the job continues after a restart.
+        LOGGER(__name__).error(f"Broadcast stopped: {e}")
+        failed = True
+    finally:
+        progress.cancel()
+    if failed:
+        job["status"] = "failed"
+    else:
+        job["status"] = "cancelled" if job.get("cancelled") else "done"
+        await broadcastdb.delete_one({"_id": JOB_ID})
+    await report(job)
@@ -1,8 +1,14 @@
-import random
+import asyncio
+import time
+from collections import OrderedDict
 from typing import Dict, List, Union
 
-from maythusharmusic import userbot
+from pymongo import UpdateOne
+
+import config
+from maythusharmusic import LOGGER, userbot
 from maythusharmusic.core.mongo import mongodb, pymongodb
+from maythusharmusic.utils import balancer
 
 authdb = mongodb.adminauth
 authuserdb = mongodb.authuser
@@ -26,6 +32,8 @@ suggdb = mongodb.suggestion
 cleandb = mongodb.cleanmode
 queriesdb = mongodb.queries
 userdb = mongodb.userstats
+chattopdb = mongodb.chattops
+usertopdb = mongodb.usertops
 videodb = mongodb.vipvideocalls
 chatsdbc = mongodb.chatsc  # for clone
 usersdbc = mongodb.tgusersdbc  # for clone
@@ -39,7 +47,6 @@ count = {}
 channelconnect = {}
 langm = {}
 loop = {}
-maintenance = []
 nonadmin = {}
 pause = {}
 playmode = {}
@@ -52,6 +59,57 @@ mute = {}
 audio = {}
 video = {}
 
+# (collection, field, value) -> (exists, expires_at) for flag lookups read on hot paths
+settings_cache = OrderedDict()
+settings_stats = {"hits": 0, "misses": 0, "invalidated": 0}
+SETTINGS_CACHE_SIZE = 100000
+
+
+def _remember(collection, field: str, value, exists: bool):
+    key = (collection.name, field, value)
+    settings_cache[key] = (exists, time.monotonic() + config.SETTINGS_CACHE_TTL)
+    settings_cache.move_to_end(key)
+    while len(settings_cache) > SETTINGS_CACHE_SIZE:
+        settings_cache.popitem(last=False)
+
+
+async def _exists(collection, field: str, value) -> bool:
+    entry = settings_cache.get((collection.name, field, value))
+    if entry and entry[1] > time.monotonic():
+        settings_stats["hits"] += 1
+        return entry[0]
+    settings_stats["misses"] += 1
+    exists = bool(await collection.find_one({field: value}))
+    _remember(collection, field, value, exists)
+    return exists
+
+
+def invalidate_settings(collection=None):
+    for key in list(settings_cache):
+        if collection is None or key[0] == collection.name:
+            del settings_cache[key]
+            settings_stats["invalidated"] += 1
+
+
+async def watch_settings():
+    # Change streams need a replica set, so this is only started when enabled.
+    async def watch(collection):
+        try:
+            async with collection.watch() as stream:
+                async for _ in stream:
+                    invalidate_settings(collection)
+        except Exception as e:
+            LOGGER(__name__).warning(
+                f"Settings change stream on {collection.name} stopped: {e}"
+            )
+
+    await asyncio.gather(
+        *(
+            watch(collection)
+            for collection in (onoffdb, autoenddb, authdb, chatsdb, gbansdb, blockeddb)
+        )
+    )
+
 # Total Queries on bot
 
 
@@ -74,111 +132,133 @@ async def set_queries(mode: int):
 
 
 # Top Chats DB
+# One document per (chat_id, vidid) with a "spot" play counter, bumped with $inc.
+# Group chats have negative ids, users are stored with their positive user id.
+
+leaderboard = {"chats": {}, "tracks": {}, "users": {}, "updated": 0}
+
+
+async def migrate_top_stats():
+    # Older deployments kept a user's whole history in one {"vidid": {...}} dict.
+    # The counts are $set, so a run interrupted before the $unset can simply repeat.
+    async for user in userdb.find({"vidid": {"$exists": True}}):
+        operations = [
+            UpdateOne(
+                {"chat_id": user["chat_id"], "vidid": vidid},
+                {"$set": {"spot": data.get("spot", 1), "title": data.get("title")}},
+                upsert=True,
+            )
+            for vidid, data in user["vidid"].items()
+        ]
+        if operations:
+            await usertopdb.bulk_write(operations, ordered=False)
+        await userdb.update_one({"_id": user["_id"]}, {"$unset": {"vidid": ""}})
+
+
+async def _bump_top(collection, chat_id: int, vidid: str, title: str):
+    await collection.update_one(
+        {"chat_id": chat_id, "vidid": vidid},
+        {"$inc": {"spot": 1}, "$set": {"title": title}},
+        upsert=True,
+    )
 
 
-async def get_top_chats() -> dict:
+async def _top_totals(collection, match: dict, group: str, limit: int = None) -> list:
+    pipeline = [
+        {"$match": {**match, "spot": {"$gt": 0}}},
+        {
+            "$group": {
+                "_id": f"${group}",
+                "spot": {"$sum": "$spot"},
+                "title": {"$first": "$title"},
+            }
+        },
+        {"$sort": {"spot": -1}},
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    return await collection.aggregate(pipeline).to_list(length=None)
+
+
+async def get_top_chats(limit: int = None) -> dict:
     results = {}
-    async for chat in chattopdb.find({"chat_id": {"$lt": 0}}):
-        chat_id = chat["chat_id"]
-        total = 0
-        for i in chat["vidid"]:
-            counts_ = chat["vidid"][i]["spot"]
-            if counts_ > 0:
-                total += counts_
-                results[chat_id] = total
+    for chat in await _top_totals(chattopdb, {"chat_id": {"$lt": 0}}, "chat_id", limit):
+        results[chat["_id"]] = chat["spot"]
     return results
 
 
-async def get_global_tops() -> dict:
+async def get_global_tops(limit: int = None) -> dict:
     results = {}
-    async for chat in chattopdb.find({"chat_id": {"$lt": 0}}):
-        for i in chat["vidid"]:
-            counts_ = chat["vidid"][i]["spot"]
-            title_ = chat["vidid"][i]["title"]
-            if counts_ > 0:
-                if i not in results:
-                    results[i] = {}
-                    results[i]["spot"] = counts_
-                    results[i]["title"] = title_
-                else:
-                    spot = results[i]["spot"]
-                    count_ = spot + counts_
-                    results[i]["spot"] = count_
+    for track in await _top_totals(chattopdb, {"chat_id": {"$lt": 0}}, "vidid", limit):
+        results[track["_id"]] = {"spot": track["spot"], "title": track["title"]}
     return results
 
 
 async def get_particulars(chat_id: int) -> Dict[str, int]:
-    ids = await chattopdb.find_one({"chat_id": chat_id})
-    if not ids:
-        return {}
-    return ids["vidid"]
+    ids = {}
+    async for track in chattopdb.find({"chat_id": chat_id}):
+        ids[track["vidid"]] = {"spot": track["spot"], "title": track["title"]}
+    return ids
 
 
 async def get_particular_top(chat_id: int, name: str) -> Union[bool, dict]:
-    ids = await get_particulars(chat_id)
-    if name in ids:
-        return ids[name]
+    track = await chattopdb.find_one({"chat_id": chat_id, "vidid": name})
+    if track:
+        return {"spot": track["spot"], "title": track["title"]}
 
 
-async def update_particular_top(chat_id: int, name: str, vidid: dict):
-    ids = await get_particulars(chat_id)
-    ids[name] = vidid
-    await chattopdb.update_one(
-        {"chat_id": chat_id}, {"$set": {"vidid": ids}}, upsert=True
-    )
+async def update_particular_top(chat_id: int, vidid: str, title: str):
+    # Records one play of vidid in chat_id.
+    await _bump_top(chattopdb, chat_id, vidid, title)
 
 
 # Top User DB
 
 
 async def get_userss(chat_id: int) -> Dict[str, int]:
-    ids = await userdb.find_one({"chat_id": chat_id})
-    if not ids:
-        return {}
-    return ids["vidid"]
+    ids = {}
+    async for track in usertopdb.find({"chat_id": chat_id}):
+        ids[track["vidid"]] = {"spot": track["spot"], "title": track["title"]}
+    return ids
 
 
 async def get_user_top(chat_id: int, name: str) -> Union[bool, dict]:
-    ids = await get_userss(chat_id)
-    if name in ids:
-        return ids[name]
+    track = await usertopdb.find_one({"chat_id": chat_id, "vidid": name})
+    if track:
+        return {"spot": track["spot"], "title": track["title"]}
 
 
-async def update_user_top(chat_id: int, name: str, vidid: dict):
-    ids = await get_userss(chat_id)
-    ids[name] = vidid
-    await userdb.update_one({"chat_id": chat_id}, {"$set": {"vidid": ids}}, upsert=True)
+async def update_user_top(user_id: int, vidid: str, title: str):
+    await _bump_top(usertopdb, user_id, vidid, title)
 
 
-async def get_topp_users() -> dict:
+async def get_topp_users(limit: int = None) -> dict:
     results = {}
-    async for chat in userdb.find({"chat_id": {"$gt": 0}}):
-        user_id = chat["chat_id"]
-        total = 0
-        for i in chat["vidid"]:
-            counts_ = chat["vidid"][i]["spot"]
-            if counts_ > 0:
-                total += counts_
-        results[user_id] = total
+    for user in await _top_totals(usertopdb, {"chat_id": {"$gt": 0}}, "chat_id", limit):
+        results[user["_id"]] = user["spot"]
     return results
 
 
+async def refresh_leaderboard():
+    leaderboard["chats"] = await get_top_chats(config.LEADERBOARD_SIZE)
+    leaderboard["tracks"] = await get_global_tops(config.LEADERBOARD_SIZE)
+    leaderboard["users"] = await get_topp_users(config.LEADERBOARD_SIZE)
+    leaderboard["updated"] = time.time()
+
+
+async def get_leaderboard() -> dict:
+    if time.time() - leaderboard["updated"] > config.LEADERBOARD_REFRESH:
+        await refresh_leaderboard()
+    return leaderboard
+
+
 async def get_assistant_number(chat_id: int) -> str:
     assistant = assistantdict.get(chat_id)
     return assistant
 
 
 async def get_client(assistant: int):
-    if int(assistant) == 1:
-        return userbot.one
-    elif int(assistant) == 2:
-        return userbot.two
-    elif int(assistant) == 3:
-        return userbot.three
-    elif int(assistant) == 4:
-        return userbot.four
-    elif int(assistant) == 5:
-        return userbot.five
+    return userbot.clients.get(int(assistant))
 
 
 async def set_assistant_new(chat_id, number):
@@ -193,7 +273,7 @@ async def set_assistant_new(chat_id, number):
 async def set_assistant(chat_id):
     from maythusharmusic.core.userbot import assistants
 
-    ran_assistant = random.choice(assistants)
+    ran_assistant = balancer.pick(assistants, active, assistantdict)
     assistantdict[chat_id] = ran_assistant
     await assdb.update_one(
         {"chat_id": chat_id},
@@ -234,7 +314,7 @@ async def get_assistant(chat_id: int) -> str:
 async def set_calls_assistant(chat_id):
     from maythusharmusic.core.userbot import assistants
 
-    ran_assistant = random.choice(assistants)
+    ran_assistant = balancer.pick(assistants, active, assistantdict)
     assistantdict[chat_id] = ran_assistant
     await assdb.update_one(
         {"chat_id": chat_id},
@@ -244,6 +324,23 @@ async def set_calls_assistant(chat_id):
     return ran_assistant
 
 
+async def rebalance_assistants() -> int:
+    # Idle chats on busy or failing assistants are unassigned and get the
+    # least loaded one the next time they play.
+    from maythusharmusic.core.userbot import assistants
+
+    moved = 0
+    for number in balancer.overloaded(assistants, active, assistantdict):
+        for chat_id, assistant in list(assistantdict.items()):
+            if assistant == number and chat_id not in active:
+                assistantdict.pop(chat_id, None)
+        result = await assdb.delete_many(
+            {"assistant": number, "chat_id": {"$nin": active}}
+        )
+        moved += result.deleted_count
+    return moved
+
+
 async def group_assistant(self, chat_id: int) -> int:
     from maythusharmusic.core.userbot import assistants
 
@@ -264,16 +361,7 @@ async def group_assistant(self, chat_id: int) -> int:
             assis = assistant
         else:
             assis = await set_calls_assistant(chat_id)
-    if int(assis) == 1:
-        return self.one
-    elif int(assis) == 2:
-        return self.two
-    elif int(assis) == 3:
-        return self.three
-    elif int(assis) == 4:
-        return self.four
-    elif int(assis) == 5:
-        return self.five
+    return self.assistant_calls.get(int(assis))
 
 
 async def is_skipmode(chat_id: int) -> bool:
@@ -322,20 +410,19 @@ async def set_upvotes(chat_id: int, mode: int):
 
 async def is_autoend() -> bool:
     chat_id = 1234
-    user = await autoenddb.find_one({"chat_id": chat_id})
-    if not user:
-        return False
-    return True
+    return await _exists(autoenddb, "chat_id", chat_id)
 
 
 async def autoend_on():
     chat_id = 1234
     await autoenddb.insert_one({"chat_id": chat_id})
+    _remember(autoenddb, "chat_id", chat_id, True)
 
 
 async def autoend_off():
     chat_id = 1234
     await autoenddb.delete_one({"chat_id": chat_id})
+    _remember(autoenddb, "chat_id", chat_id, False)
 
 
 async def get_loop(chat_id: int) -> int:
@@ -496,10 +583,7 @@ async def remove_active_video_chat(chat_id: int):
 
 
 async def check_nonadmin_chat(chat_id: int) -> bool:
-    user = await authdb.find_one({"chat_id": chat_id})
-    if not user:
-        return False
-    return True
+    return await _exists(authdb, "chat_id", chat_id)
 
 
 async def is_nonadmin_chat(chat_id: int) -> bool:
@@ -519,6 +603,7 @@ async def add_nonadmin_chat(chat_id: int):
     is_admin = await check_nonadmin_chat(chat_id)
     if is_admin:
         return
+    _remember(authdb, "chat_id", chat_id, True)
     return await authdb.insert_one({"chat_id": chat_id})
 
 
@@ -527,20 +612,19 @@ async def remove_nonadmin_chat(chat_id: int):
     is_admin = await check_nonadmin_chat(chat_id)
     if not is_admin:
         return
+    _remember(authdb, "chat_id", chat_id, False)
     return await authdb.delete_one({"chat_id": chat_id})
 
 
 async def is_on_off(on_off: int) -> bool:
-    onoff = await onoffdb.find_one({"on_off": on_off})
-    if not onoff:
-        return False
-    return True
+    return await _exists(onoffdb, "on_off", on_off)
 
 
 async def add_on(on_off: int):
     is_on = await is_on_off(on_off)
     if is_on:
         return
+    _remember(onoffdb, "on_off", on_off, True)
     return await onoffdb.insert_one({"on_off": on_off})
 
 
@@ -548,43 +632,21 @@ async def add_off(on_off: int):
     is_off = await is_on_off(on_off)
     if not is_off:
         return
+    _remember(onoffdb, "on_off", on_off, False)
     return await onoffdb.delete_one({"on_off": on_off})
 
 
 async def is_maintenance():
-    if not maintenance:
-        get = await onoffdb.find_one({"on_off": 1})
-        if not get:
-            maintenance.clear()
-            maintenance.append(2)
-            return True
-        else:
-            maintenance.clear()
-            maintenance.append(1)
-            return False
-    else:
-        if 1 in maintenance:
-            return False
-        else:
-            return True
+    # The on_off 1 flag is set while maintenance is on, and this returns False then.
+    return not await is_on_off(1)
 
 
 async def maintenance_off():
-    maintenance.clear()
-    maintenance.append(2)
-    is_off = await is_on_off(1)
-    if not is_off:
-        return
-    return await onoffdb.delete_one({"on_off": 1})
+    return await add_off(1)
 
 
 async def maintenance_on():
-    maintenance.clear()
-    maintenance.append(1)
-    is_on = await is_on_off(1)
-    if is_on:
-        return
-    return await onoffdb.insert_one({"on_off": 1})
+    return await add_on(1)
 
 
 async def is_served_user(user_id: int) -> bool:
@@ -616,20 +678,19 @@ async def get_served_chats() -> list:
 
 
 async def is_served_chat(chat_id: int) -> bool:
-    chat = await chatsdb.find_one({"chat_id": chat_id})
-    if not chat:
-        return False
-    return True
+    return await _exists(chatsdb, "chat_id", chat_id)
 
 
 async def add_served_chat(chat_id: int):
     is_served = await is_served_chat(chat_id)
     if is_served:
         return
+    _remember(chatsdb, "chat_id", chat_id, True)
     return await chatsdb.insert_one({"chat_id": chat_id})
 
 
 async def delete_served_chat(chat_id: int):
+    _remember(chatsdb, "chat_id", chat_id, False)
     await chatsdb.delete_one({"chat_id": chat_id})
 
 
@@ -710,16 +771,14 @@ async def get_gbanned() -> list:
 
 
 async def is_gbanned_user(user_id: int) -> bool:
-    user = await gbansdb.find_one({"user_id": user_id})
-    if not user:
-        return False
-    return True
+    return await _exists(gbansdb, "user_id", user_id)
 
 
 async def add_gban_user(user_id: int):
     is_gbanned = await is_gbanned_user(user_id)
     if is_gbanned:
         return
+    _remember(gbansdb, "user_id", user_id, True)
     return await gbansdb.insert_one({"user_id": user_id})
 
 
@@ -727,6 +786,7 @@ async def remove_gban_user(user_id: int):
     is_gbanned = await is_gbanned_user(user_id)
     if not is_gbanned:
         return
+    _remember(gbansdb, "user_id", user_id, False)
     return await gbansdb.delete_one({"user_id": user_id})
 
 
@@ -770,16 +830,14 @@ async def get_banned_count() -> int:
 
 
 async def is_banned_user(user_id: int) -> bool:
-    user = await blockeddb.find_one({"user_id": user_id})
-    if not user:
-        return False
-    return True
+    return await _exists(blockeddb, "user_id", user_id)
 
 
 async def add_banned_user(user_id: int):
     is_gbanned = await is_banned_user(user_id)
     if is_gbanned:
         return
+    _remember(blockeddb, "user_id", user_id, True)
     return await blockeddb.insert_one({"user_id": user_id})
 
 
@@ -787,6 +845,7 @@ async def remove_banned_user(user_id: int):
     is_gbanned = await is_banned_user(user_id)
     if not is_gbanned:
         return
+    _remember(blockeddb, "user_id", user_id, False)
     return await blockeddb.delete_one({"user_id": user_id})
 
 
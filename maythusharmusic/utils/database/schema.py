@@ -0,0 +1,98 @@
+from maythusharmusic.core.mongo import mongodb
+from maythusharmusic.logging import LOGGER
+
+# collection name -> list of (keys, options) that must exist on it
+INDEXES = {
+    "adminauth": [([("chat_id", 1)], {})],
+    "afk": [([("user_id", 1)], {})],
+    "assistants": [([("chat_id", 1)], {})],
+    "authuser": [([("chat_id", 1)], {})],
+    "autoend": [([("chat_id", 1)], {})],
+    "blacklistChat": [([("chat_id", 1)], {})],
+    "blockedusers": [([("user_id", 1)], {})],
+    "chats": [([("chat_id", 1)], {})],
+    "chatsc": [([("chat_id", 1)], {})],
+    "chattops": [
+        ([("chat_id", 1), ("vidid", 1)], {"unique": True}),
+        ([("vidid", 1)], {}),
+    ],
+    "cleanmode": [([("chat_id", 1)], {})],
+    "cloneownerdb": [([("bot_id", 1)], {})],
+    "clonebotnamedb": [([("bot_id", 1)], {})],
+    "couple": [([("chat_id", 1)], {})],
+    "cplaymode": [([("chat_id", 1)], {})],
+    "gban": [([("user_id", 1)], {})],
+    "language": [([("chat_id", 1)], {})],
+    "onoffper": [([("on_off", 1)], {})],
+    "playlistitems": [
+        ([("chat_id", 1), ("videoid", 1)], {"unique": True}),
+        ([("chat_id", 1), ("position", 1)], {}),
+    ],
+    "playmode": [([("chat_id", 1)], {})],
+    "playtypedb": [([("chat_id", 1)], {})],
+    "privatechats": [([("chat_id", 1)], {})],
+    "queries": [([("chat_id", 1)], {})],
+    "skipmode": [([("chat_id", 1)], {})],
+    "sudoers": [([("sudo", 1)], {})],
+    "suggestion": [([("chat_id", 1)], {})],
+    "tgusersdb": [([("user_id", 1)], {})],
+    "tgusersdbc": [([("user_id", 1)], {})],
+    "upcount": [([("chat_id", 1)], {})],
+    "usertops": [
+        ([("chat_id", 1), ("vidid", 1)], {"unique": True}),
+        ([("vidid", 1)], {}),
+    ],
+    "warns": [([("chat_id", 1)], {})],
+    "ytmeta": [([("key", 1)], {})],
+}
+
+# name -> (collection name, filter) for the lookups that run on every message or play
+HOT_QUERIES = {
+    "served chat": ("chats", {"chat_id": -1}),
+    "served user": ("tgusersdb", {"user_id": 1}),
+    "gbanned user": ("gban", {"user_id": 1}),
+    "blocked user": ("blockedusers", {"user_id": 1}),
+    "language": ("language", {"chat_id": -1}),
+    "assistant": ("assistants", {"chat_id": -1}),
+    "playmode": ("playmode", {"chat_id": -1}),
+    "playtype": ("playtypedb", {"chat_id": -1}),
+    "non admin": ("adminauth", {"chat_id": -1}),
+    "auth users": ("authuser", {"chat_id": -1}),
+    "on off": ("onoffper", {"on_off": 1}),
+    "afk": ("afk", {"user_id": 1}),
+    "playlist": ("playlistitems", {"chat_id": 1}),
+    "chat tops": ("chattops", {"chat_id": -1, "vidid": ""}),
+    "user tops": ("usertops", {"chat_id": 1, "vidid": ""}),
+    "yt metadata": ("ytmeta", {"key": ""}),
+}
+
+
+async def ensure_indexes():
+    for name, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                await mongodb[name].create_index(keys, background=True, **options)
+            except Exception as e:
+                LOGGER(__name__).warning(f"Could not create index {keys} on {name}: {e}")
+
+
+def _stages(plan: dict):
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def audit_queries() -> dict:
+    results = {}
+    for name, (collection, query) in HOT_QUERIES.items():
+        try:
+            explain = await mongodb[collection].find(query).limit(1).explain()
+            plan = explain["queryPlanner"]["winningPlan"]
+            stages = [stage for stage in _stages(plan) if stage]
+            results[name] = "COLLSCAN" if "COLLSCAN" in stages else stages[-1]
+        except Exception as e:
+            results[name] = f"error: {type(e).__name__}"
+    return results
@@ -11,6 +11,7 @@ from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from maythusharmusic import YouTube, app
 from maythusharmusic.misc import SUDOERS
+from maythusharmusic.utils.admincache import get_admins
 from maythusharmusic.utils.database import (
     get_assistant,
     get_cmode,
@@ -21,7 +22,7 @@ from maythusharmusic.utils.database import (
     is_maintenance,
 )
 from maythusharmusic.utils.inline import botplaylist_markup
-from config import PLAYLIST_IMG_URL, SUPPORT_CHAT, adminlist
+from config import PLAYLIST_IMG_URL, SUPPORT_CHAT
 from strings import get_string
 
 links = {}
@@ -94,7 +95,7 @@ def PlayWrapper(command):
         playty = await get_playtype(message.chat.id)
         if playty != "Everyone":
             if message.from_user.id not in SUDOERS:
-                admins = adminlist.get(message.chat.id)
+                admins = await get_admins(message.chat.id)
                 if not admins:
                     return await message.reply_text(_["admin_18"])
                 else:
@@ -263,7 +264,7 @@ def CPlayWrapper(command):
         playty = await get_playtype(message.chat.id)
         if playty != "Everyone":
             if message.from_user.id not in SUDOERS:
-                admins = adminlist.get(message.chat.id)
+                admins = await get_admins(message.chat.id)
                 if not admins:
                     return await message.reply_text(_["admin_13"])
                 else:
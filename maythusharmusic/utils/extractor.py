@@ -0,0 +1,124 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import config
+import workers
+from workers import ytdl
+
+POOL_SIZES = {"extract": config.YTDL_WORKERS, "download": config.DOWNLOAD_CONCURRENCY}
+pools = {}
+LATENCY_BUCKETS = [250, 500, 1000, 2500, 5000, 10000]
+pool_stats = {
+    name: {
+        "calls": 0,
+        "errors": 0,
+        "timeouts": 0,
+        "recycled": 0,
+        "histogram": {bucket: 0 for bucket in LATENCY_BUCKETS + ["inf"]},
+    }
+    for name in POOL_SIZES
+}
+
+
+def _pool(name: str) -> ProcessPoolExecutor:
+    pool = pools.get(name)
+    if pool is None:
+        pool = pools[name] = ProcessPoolExecutor(
+            max_workers=POOL_SIZES[name], mp_context=workers.context()
+        )
+    return pool
+
+
+def _terminate(processes: list):
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+
+
+def _recycle(name: str, pool: ProcessPoolExecutor, grace: int):
+    # A timed out call keeps its worker busy forever, so new calls go to a
+    # fresh pool and the old one is killed once its other calls had time to end.
+    if pools.get(name) is not pool:
+        return
+    del pools[name]
+    pool_stats[name]["recycled"] += 1
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False)
+    asyncio.get_running_loop().call_later(grace, _terminate, processes)
+
+
+def _record_latency(name: str, seconds: float):
+    histogram = pool_stats[name]["histogram"]
+    millis = seconds * 1000
+    for bucket in LATENCY_BUCKETS:
+        if millis <= bucket:
+            histogram[bucket] += 1
+            break
+    else:
+        histogram["inf"] += 1
+
+
+async def _call(name: str, timeout: int, func, *args):
+    loop = asyncio.get_running_loop()
+    stats = pool_stats[name]
+    pool = _pool(name)
+    start = time.monotonic()
+    stats["calls"] += 1
+    try:
+        return await asyncio.wait_for(
+            loop.run_in_executor(pool, func, *args), timeout
+        )
+    except asyncio.TimeoutError:
+        stats["timeouts"] += 1
+        _recycle(name, pool, timeout)
+        raise
+    except Exception:
+        stats["errors"] += 1
+        raise
+    finally:
+        _record_latency(name, time.monotonic() - start)
+
+
+async def extract(link: str, opts: dict, timeout: int = None) -> dict:
+    return await _call(
+        "extract", timeout or config.YTDL_EXTRACT_TIMEOUT, ytdl.extract, link, opts
+    )
+
+
+async def stream_url(link: str, opts: dict, timeout: int = None) -> str:
+    return await _call(
+        "extract", timeout or config.YTDL_EXTRACT_TIMEOUT, ytdl.stream_url, link, opts
+    )
+
+
+async def playlist_ids(link: str, opts: dict, timeout: int = None) -> list:
+    return await _call(
+        "extract", timeout or config.YTDL_EXTRACT_TIMEOUT, ytdl.playlist_ids, link, opts
+    )
+
+
+async def download(link: str, opts: dict, timeout: int = None) -> str:
+    return await _call(
+        "download", timeout or config.YTDL_DOWNLOAD_TIMEOUT, ytdl.download, link, opts
+    )
+
+
+async def download_only(link: str, opts: dict, timeout: int = None):
+    return await _call(
+        "download",
+        timeout or config.YTDL_DOWNLOAD_TIMEOUT,
+        ytdl.download_only,
+        link,
+        opts,
+    )
+
+
+async def download_info(info: dict, opts: dict, timeout: int = None):
+    return await _call(
+        "download",
+        timeout or config.YTDL_DOWNLOAD_TIMEOUT,
+        ytdl.download_info,
+        info,
+        opts,
+    )
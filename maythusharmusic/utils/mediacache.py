@@ -0,0 +1,145 @@
+import json
+import os
+import time
+
+import config
+from maythusharmusic.logging import LOGGER
+
+INDEX_PATH = os.path.join("downloads", "cache_index.json")
+
+# key -> {"vidid", "kind", "path", "size", "last_access", "hits", "refs"}
+index = {}
+stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+
+def _key(vidid: str, kind: str) -> str:
+    return f"{kind}:{vidid}"
+
+
+def _load():
+    try:
+        with open(INDEX_PATH, "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return
+    for key, entry in data.items():
+        if not os.path.isfile(entry.get("path", "")):
+            continue
+        entry["refs"] = 0
+        index[key] = entry
+    LOGGER(__name__).info(f"Media cache loaded with {len(index)} files.")
+
+
+def _save():
+    tmp = INDEX_PATH + ".tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, INDEX_PATH)
+    except OSError as e:
+        LOGGER(__name__).warning(f"Could not write media cache index: {e}")
+
+
+def _by_path(path: str):
+    for entry in index.values():
+        if entry["path"] == path:
+            return entry
+    return None
+
+
+def _queued_vidids() -> set:
+    from maythusharmusic.misc import db
+
+    vidids = set()
+    for queue in list(db.values()):
+        for item in queue or []:
+            vidid = item.get("vidid")
+            if vidid:
+                vidids.add(vidid)
+    return vidids
+
+
+def total_size() -> int:
+    return sum(entry["size"] for entry in index.values())
+
+
+def lookup(vidid: str, kind: str):
+    entry = index.get(_key(vidid, kind))
+    if entry and os.path.isfile(entry["path"]):
+        entry["last_access"] = time.time()
+        entry["hits"] += 1
+        stats["hits"] += 1
+        return entry["path"]
+    if entry:
+        index.pop(_key(vidid, kind), None)
+    stats["misses"] += 1
+    return None
+
+
+def store(vidid: str, kind: str, path: str):
+    if not path or not os.path.isfile(path):
+        return
+    key = _key(vidid, kind)
+    entry = index.get(key)
+    if entry and entry["path"] == path:
+        entry["last_access"] = time.time()
+        return
+    index[key] = {
+        "vidid": vidid,
+        "kind": kind,
+        "path": path,
+        "size": os.path.getsize(path),
+        "last_access": time.time(),
+        "hits": 0,
+        "refs": 0,
+    }
+    evict(keep=key)
+    _save()
+
+
+def is_managed(path: str) -> bool:
+    return _by_path(path) is not None
+
+
+def acquire(path: str):
+    entry = _by_path(path)
+    if entry:
+        entry["refs"] += 1
+
+
+def release(path: str) -> bool:
+    entry = _by_path(path)
+    if not entry:
+        return False
+    entry["refs"] = max(entry["refs"] - 1, 0)
+    entry["last_access"] = time.time()
+    evict()
+    _save()
+    return True
+
+
+def evict(keep: str = None):
+    budget = config.MEDIA_CACHE_SIZE * 1024 * 1024
+    size = total_size()
+    if size <= budget:
+        return
+    if config.MEDIA_CACHE_POLICY == "lfu":
+        order = lambda item: (item[1]["hits"], item[1]["last_access"])
+    else:
+        order = lambda item: item[1]["last_access"]
+    busy = _queued_vidids()
+    for key, entry in sorted(index.items(), key=order):
+        if size <= budget:
+            break
+        if key == keep or entry["refs"] > 0 or entry["vidid"] in busy:
+            continue
+        try:
+            os.remove(entry["path"])
+        except OSError:
+            pass
+        index.pop(key, None)
+        size -= entry["size"]
+        stats["evicted"] += 1
+
+
+_load()
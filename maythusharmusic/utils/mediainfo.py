@@ -0,0 +1,211 @@
+import asyncio
+import os
+import struct
+from collections import OrderedDict
+
+import config
+from maythusharmusic.logging import LOGGER
+from maythusharmusic.utils.formatters import check_duration
+
+CACHE_SIZE = 1024
+
+# (path, size, mtime) -> duration in seconds
+durations = OrderedDict()
+probe_stats = {"hits": 0, "parsed": 0, "ffprobe": 0}
+_semaphore = asyncio.Semaphore(config.PROBE_CONCURRENCY)
+
+
+def _mp4(f, size: int):
+    def boxes(start, end):
+        offset = start
+        while offset + 8 <= end:
+            f.seek(offset)
+            box_size, kind = struct.unpack(">I4s", f.read(8))
+            header = 8
+            if box_size == 1:
+                box_size = struct.unpack(">Q", f.read(8))[0]
+                header = 16
+            elif box_size == 0:
+                box_size = end - offset
+            if box_size < header:
+                return
+            yield kind, offset + header, offset + box_size
+            offset += box_size
+
+    for kind, start, end in boxes(0, size):
+        if kind != b"moov":
+            continue
+        for kind, start, end in boxes(start, end):
+            if kind != b"mvhd":
+                continue
+            f.seek(start)
+            if f.read(1) == b"\x01":
+                f.seek(start + 20)
+                timescale, duration = struct.unpack(">IQ", f.read(12))
+            else:
+                f.seek(start + 12)
+                timescale, duration = struct.unpack(">II", f.read(8))
+            return duration / timescale if timescale else None
+    return None
+
+
+def _vint(f, keep_marker: bool):
+    first = f.read(1)
+    if not first:
+        return None, 0
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first[0] & mask:
+        length += 1
+        mask >>= 1
+    value = first[0] if keep_marker else first[0] & (mask - 1)
+    for byte in f.read(length - 1):
+        value = (value << 8) | byte
+    return value, length
+
+
+def _matroska(f, size: int):
+    scale = 1000000
+    offset = 0
+    end = size
+    while offset < end:
+        f.seek(offset)
+        element, id_length = _vint(f, True)
+        length, size_length = _vint(f, False)
+        if element is None:
+            return None
+        data = offset + id_length + size_length
+        # Segment and Info are descended into, everything else is skipped.
+        if element in (0x18538067, 0x1549A966):
+            offset = data
+            if element == 0x1549A966:
+                end = min(end, data + length)
+            continue
+        f.seek(data)
+        if element == 0x2AD7B1:
+            scale = int.from_bytes(f.read(length), "big")
+        elif element == 0x4489:
+            value = f.read(length)
+            duration = struct.unpack(">f" if length == 4 else ">d", value)[0]
+            return duration * scale / 1e9
+        offset = data + length
+    return None
+
+
+def _ogg(f, size: int):
+    f.seek(0)
+    page = f.read(512)
+    segments = page[26]
+    packet = page[27 + segments :]
+    if packet.startswith(b"OpusHead"):
+        rate = 48000
+        skip = struct.unpack("<H", packet[10:12])[0]
+    elif packet.startswith(b"\x01vorbis"):
+        rate = struct.unpack("<I", packet[12:16])[0]
+        skip = 0
+    else:
+        return None
+    f.seek(max(0, size - 65536))
+    tail = f.read()
+    last = tail.rfind(b"OggS")
+    if last < 0 or not rate:
+        return None
+    granule = struct.unpack("<q", tail[last + 6 : last + 14])[0]
+    return (granule - skip) / rate
+
+
+MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _mp3(f, size: int):
+    f.seek(0)
+    start = 0
+    header = f.read(10)
+    if header.startswith(b"ID3"):
+        start = 10 + sum(byte << (7 * (3 - i)) for i, byte in enumerate(header[6:10]))
+    f.seek(start)
+    window = f.read(4096)
+    for i in range(len(window) - 4):
+        if window[i] == 0xFF and window[i + 1] & 0xE0 == 0xE0:
+            break
+    else:
+        return None
+    frame = window[i:]
+    version = (frame[1] >> 3) & 3
+    layer = (frame[1] >> 1) & 3
+    if version == 1 or layer != 1 or version not in MP3_RATES:
+        return None
+    bitrate = MP3_BITRATES[1 if version == 3 else 2][frame[2] >> 4] * 1000
+    rate_index = (frame[2] >> 2) & 3
+    if rate_index == 3:
+        return None
+    rate = MP3_RATES[version][rate_index]
+    mono = frame[3] >> 6 == 3
+    samples = 1152 if version == 3 else 576
+    side = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = frame[4 + side : 4 + side + 12]
+    if xing[:4] in (b"Xing", b"Info") and xing[7] & 1:
+        return struct.unpack(">I", xing[8:12])[0] * samples / rate
+    if frame[36:40] == b"VBRI":
+        return struct.unpack(">I", frame[50:54])[0] * samples / rate
+    if not bitrate:
+        return None
+    return (size - start - i) * 8 / bitrate
+
+
+def _parse(file_path: str, size: int):
+    with open(file_path, "rb") as f:
+        magic = f.read(12)
+        if magic[4:8] == b"ftyp":
+            return _mp4(f, size)
+        if magic.startswith(b"\x1aE\xdf\xa3"):
+            return _matroska(f, size)
+        if magic.startswith(b"OggS"):
+            return _ogg(f, size)
+        if magic.startswith(b"ID3") or (magic[0] == 0xFF and magic[1] & 0xE0 == 0xE0):
+            return _mp3(f, size)
+    return None
+
+
+def _key(file_path: str):
+    try:
+        stat = os.stat(file_path)
+    except (OSError, ValueError):
+        return None
+    return file_path, stat.st_size, stat.st_mtime_ns
+
+
+def _probe(file_path: str, key):
+    # Runs in an executor thread, the caller counts the result on the loop.
+    duration = None
+    if key:
+        try:
+            duration = _parse(file_path, key[1])
+        except Exception as e:
+            LOGGER(__name__).debug(f"Could not parse {file_path}: {e}")
+    if duration and duration > 0:
+        return duration, True
+    return check_duration(file_path), False
+
+
+async def get_duration(file_path: str):
+    key = _key(file_path)
+    if key in durations:
+        durations.move_to_end(key)
+        probe_stats["hits"] += 1
+        return durations[key]
+    async with _semaphore:
+        duration, parsed = await asyncio.get_event_loop().run_in_executor(
+            None, _probe, file_path, key
+        )
+    probe_stats["parsed" if parsed else "ffprobe"] += 1
+    # Urls and unknown durations are not cached, only files that exist.
+    if key and duration != "Unknown":
+        durations[key] = duration
+        if len(durations) > CACHE_SIZE:
+            durations.popitem(last=False)
+    return duration
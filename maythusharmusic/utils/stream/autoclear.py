@@ -1,6 +1,7 @@
 import os
 
 from config import autoclean
+from maythusharmusic.utils import mediacache
 
 
 async def auto_clean(popped):
@@ -8,6 +9,8 @@ async def auto_clean(popped):
         rem = popped["file"]
         autoclean.remove(rem)
         count = autoclean.count(rem)
+        if mediacache.release(rem):
+            return
         if count == 0:
             if "vid_" not in rem or "live_" not in rem or "index_" not in rem:
                 try:
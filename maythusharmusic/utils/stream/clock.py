@@ -0,0 +1,62 @@
+import time
+
+from maythusharmusic.misc import db
+
+# chat_id -> {"position", "since", "rate", "paused"}
+# The played position is derived from a monotonic anchor whenever it is
+# read, so nothing has to tick while a stream is running.
+clocks = {}
+
+
+def _position(clock) -> float:
+    if clock["paused"]:
+        return clock["position"]
+    return clock["position"] + (time.monotonic() - clock["since"]) * clock["rate"]
+
+
+def start(chat_id: int, position: float = 0, rate: float = 1.0):
+    clocks[chat_id] = {
+        "position": position,
+        "since": time.monotonic(),
+        "rate": rate,
+        "paused": False,
+    }
+
+
+def pause(chat_id: int):
+    clock = clocks.get(chat_id)
+    if clock and not clock["paused"]:
+        clock["position"] = _position(clock)
+        clock["paused"] = True
+
+
+def resume(chat_id: int):
+    clock = clocks.get(chat_id)
+    if clock and clock["paused"]:
+        clock["since"] = time.monotonic()
+        clock["paused"] = False
+
+
+def seek(chat_id: int, position: float, rate: float = None):
+    clock = clocks.get(chat_id)
+    if not clock:
+        return start(chat_id, position, rate or 1.0)
+    clock["position"] = position
+    clock["since"] = time.monotonic()
+    if rate:
+        clock["rate"] = rate
+
+
+def clear(chat_id: int):
+    clocks.pop(chat_id, None)
+
+
+def get_played(chat_id: int) -> int:
+    clock = clocks.get(chat_id)
+    playing = db.get(chat_id)
+    if not clock or not playing:
+        return 0
+    duration = int(playing[0]["seconds"])
+    if duration == 0:
+        return 0
+    return max(0, min(int(_position(clock)), duration))
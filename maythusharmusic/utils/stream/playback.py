@@ -0,0 +1,107 @@
+import asyncio
+import os
+import shutil
+from collections import OrderedDict
+
+import config
+from maythusharmusic import LOGGER
+from maythusharmusic.misc import db
+
+PLAYBACK_DIR = os.path.join(os.getcwd(), "playback")
+
+# rendered path -> size in bytes, least recently used first
+renders = OrderedDict()
+_rendering = {}
+stats = {"live": 0, "rendered": 0, "reused": 0, "evicted": 0}
+
+
+def live_parameters(position: int, seconds: int, rate: float) -> str:
+    # Only the audio process gets the filter, -atmid places it after the input.
+    stats["live"] += 1
+    return f"-ss {position} -to {seconds} -atmid -af atempo={rate}"
+
+
+def rendered_parameters(position: int, seconds: int, rate: float) -> str:
+    return f"-ss {int(position / rate)} -to {int(seconds / rate)}"
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _in_use() -> set:
+    return {
+        item.get("speed_path") for queue in list(db.values()) for item in queue or []
+    }
+
+
+def _evict():
+    budget = config.SPEED_CACHE_SIZE * 1024 * 1024
+    size = sum(renders.values())
+    busy = _in_use()
+    for path in list(renders):
+        if size <= budget:
+            break
+        if path in busy:
+            continue
+        _remove(path)
+        size -= renders.pop(path)
+        stats["evicted"] += 1
+
+
+async def _render(file_path: str, speed: str, out: str) -> str:
+    rate = float(speed)
+    tmp = os.path.join(os.path.dirname(out), "." + os.path.basename(out))
+    proc = await asyncio.create_subprocess_exec(
+        "ffmpeg",
+        "-y",
+        "-i",
+        file_path,
+        "-filter:v",
+        f"setpts={round(1 / rate, 4)}*PTS",
+        "-filter:a",
+        f"atempo={rate}",
+        tmp,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await asyncio.wait_for(proc.wait(), config.SPEED_RENDER_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        _remove(tmp)
+        raise
+    if proc.returncode != 0 or not os.path.isfile(tmp):
+        _remove(tmp)
+        raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
+    os.replace(tmp, out)
+    renders[out] = os.path.getsize(out)
+    stats["rendered"] += 1
+    _evict()
+    return out
+
+
+async def render(file_path: str, speed: str) -> str:
+    out = os.path.join(PLAYBACK_DIR, str(speed), os.path.basename(file_path))
+    if out in renders and os.path.isfile(out):
+        renders.move_to_end(out)
+        stats["reused"] += 1
+        return out
+    renders.pop(out, None)
+    if out not in _rendering:
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        _rendering[out] = asyncio.ensure_future(_render(file_path, speed, out))
+        _rendering[out].add_done_callback(lambda _: _rendering.pop(out, None))
+    try:
+        return await asyncio.shield(_rendering[out])
+    except Exception as e:
+        LOGGER(__name__).warning(f"Rendering {file_path} at {speed}x failed: {e!r}")
+        raise
+
+
+# Renders left over from a previous run are not tracked, so they only take space.
+shutil.rmtree(PLAYBACK_DIR, ignore_errors=True)
@@ -0,0 +1,55 @@
+import asyncio
+
+import config
+from config import autoclean
+from maythusharmusic import LOGGER, YouTube
+from maythusharmusic.misc import db
+from maythusharmusic.utils import mediacache
+
+# (chat_id, vidid, streamtype) -> running prefetch task
+prefetching = {}
+
+
+async def _prefetch(chat_id, item):
+    vidid = item["vidid"]
+    placeholder = item["file"]
+    try:
+        file_path, direct = await YouTube.download(
+            vidid,
+            None,
+            videoid=True,
+            video=str(item["streamtype"]) == "video",
+        )
+    except Exception as e:
+        LOGGER(__name__).warning(f"Prefetch of {vidid} failed: {e}")
+        return
+    # Stream urls expire, only swap in files that are on disk.
+    if not direct or not file_path:
+        return
+    check = db.get(chat_id) or []
+    if not any(entry is item for entry in check[1:]):
+        return
+    if item["file"] != placeholder:
+        return
+    item["file"] = file_path
+    try:
+        autoclean.remove(placeholder)
+    except ValueError:
+        pass
+    autoclean.append(file_path)
+    mediacache.acquire(file_path)
+
+
+def prefetch_next(chat_id):
+    if not config.PREFETCH_DEPTH:
+        return
+    check = db.get(chat_id) or []
+    for item in check[1 : config.PREFETCH_DEPTH + 1]:
+        if not str(item.get("file", "")).startswith("vid_"):
+            continue
+        key = (chat_id, item["vidid"], item["streamtype"])
+        if key in prefetching:
+            continue
+        task = asyncio.ensure_future(_prefetch(chat_id, item))
+        prefetching[key] = task
+        task.add_done_callback(lambda _, key=key: prefetching.pop(key, None))
@@ -1,8 +1,9 @@
-import asyncio
 from typing import Union
 from pyrogram import Client, client
 from maythusharmusic.misc import db
-from maythusharmusic.utils.formatters import check_duration, seconds_to_min
+from maythusharmusic.utils import mediacache, mediainfo
+from maythusharmusic.utils.formatters import seconds_to_min
+from maythusharmusic.utils.stream.prefetch import prefetch_next
 from config import autoclean, time_to_seconds
 
 
@@ -33,7 +34,6 @@ async def put_queue(
         "file": file,
         "vidid": vidid,
         "seconds": duration_in_seconds,
-        "played": 0,
     }
     if forceplay:
         check = db.get(chat_id)
@@ -45,6 +45,8 @@ async def put_queue(
     else:
         db[chat_id].append(put)
     autoclean.append(file)
+    mediacache.acquire(file)
+    prefetch_next(chat_id)
 
 
 async def put_queue_index(
@@ -60,9 +62,7 @@ async def put_queue_index(
 ):
     if "20.212.146.162" in vidid:
         try:
-            dur = await asyncio.get_event_loop().run_in_executor(
-                None, check_duration, vidid
-            )
+            dur = await mediainfo.get_duration(vidid)
             duration = seconds_to_min(dur)
         except:
             duration = "ᴜʀʟ sᴛʀᴇᴀᴍ"
@@ -78,7 +78,6 @@ async def put_queue_index(
         "file": file,
         "vidid": vidid,
         "seconds": dur,
-        "played": 0,
     }
     if forceplay:
         check = db.get(chat_id)
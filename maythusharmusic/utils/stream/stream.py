@@ -1,4 +1,8 @@
+import asyncio
 import os
+import time
+from collections import deque
+from itertools import islice
 from random import randint
 from typing import Union
 
@@ -13,7 +17,7 @@ from maythusharmusic.utils.exceptions import AssistantErr
 from maythusharmusic.utils.inline import aq_markup, close_markup, stream_markup
 from maythusharmusic.utils.pastebin import HottyBin
 from maythusharmusic.utils.stream.queue import put_queue, put_queue_index
-from maythusharmusic.utils.thumbnails import get_thumb
+from maythusharmusic.utils.thumbnails import get_thumb, remember_thumb
 
 
 async def stream(
@@ -36,83 +40,124 @@ async def stream(
     if streamtype == "playlist":
         msg = f"{_['play_19']}\n\n"
         count = 0
-        for search in result:
-            if int(count) == config.PLAYLIST_FETCH_LIMIT:
-                continue
-            try:
+        resolver = asyncio.Semaphore(config.PLAYLIST_RESOLVE_CONCURRENCY)
+        # mystic is left to the download once the first track starts playing.
+        progress = {"done": 0, "edited": 0, "downloading": False}
+
+        async def resolve(search):
+            # Cancellation is left to propagate, a cancelled task must not touch mystic.
+            async with resolver:
+                try:
+                    details = await YouTube.details(search, False if spotify else True)
+                except Exception:
+                    details = None
+            progress["done"] += 1
+            if (
+                not progress["downloading"]
+                and time.monotonic() - progress["edited"] >= 3
+            ):
+                progress["edited"] = time.monotonic()
+                try:
+                    await mystic.edit_text(
+                        _["play_23"].format(progress["done"], len(result))
+                    )
+                except Exception:
+                    pass
+            return details
+
+        # Resolve a window of entries ahead but consume them in playlist order,
+        # so the first playable track starts as soon as it is ready.
+        searches = iter(result)
+        window = config.PLAYLIST_FETCH_LIMIT + config.PLAYLIST_RESOLVE_CONCURRENCY
+        tasks = deque(
+            asyncio.ensure_future(resolve(search))
+            for search in islice(searches, window)
+        )
+        try:
+            while tasks:
+                if int(count) == config.PLAYLIST_FETCH_LIMIT:
+                    break
+                details = await tasks.popleft()
+                for search in islice(searches, 1):
+                    tasks.append(asyncio.ensure_future(resolve(search)))
+                if not details:
+                    continue
                 (
                     title,
                     duration_min,
                     duration_sec,
                     thumbnail,
                     vidid,
-                ) = await YouTube.details(search, False if spotify else True)
-            except:
-                continue
-            if str(duration_min) == "None":
-                continue
-            if duration_sec > config.DURATION_LIMIT:
-                continue
-            if await is_active_chat(chat_id):
-                await put_queue(
-                    chat_id,
-                    original_chat_id,
-                    f"vid_{vidid}",
-                    title,
-                    duration_min,
-                    user_name,
-                    vidid,
-                    user_id,
-                    "video" if video else "audio",
-                )
-                position = len(db.get(chat_id)) - 1
-                count += 1
-                msg += f"{count}. {title[:70]}\n"
-                msg += f"{_['play_20']} {position}\n\n"
-            else:
-                if not forceplay:
-                    db[chat_id] = []
-                status = True if video else None
-                try:
-                    file_path, direct = await YouTube.download(
-                        vidid, mystic, video=status, videoid=True
+                ) = details
+                if str(duration_min) == "None":
+                    continue
+                if duration_sec > config.DURATION_LIMIT:
+                    continue
+                if await is_active_chat(chat_id):
+                    await put_queue(
+                        chat_id,
+                        original_chat_id,
+                        f"vid_{vidid}",
+                        title,
+                        duration_min,
+                        user_name,
+                        vidid,
+                        user_id,
+                        "video" if video else "audio",
                     )
-                except:
-                    raise AssistantErr(_["play_14"])
-                await Hotty.join_call(
-                    chat_id,
-                    original_chat_id,
-                    file_path,
-                    video=status,
-                    image=thumbnail,
-                )
-                await put_queue(
-                    chat_id,
-                    original_chat_id,
-                    file_path if direct else f"vid_{vidid}",
-                    title,
-                    duration_min,
-                    user_name,
-                    vidid,
-                    user_id,
-                    "video" if video else "audio",
-                    forceplay=forceplay,
-                )
-                img = await get_thumb(vidid)
-                button = stream_markup(_, chat_id)
-                run = await app.send_photo(
-                    original_chat_id,
-                    photo=img,
-                    caption=_["stream_1"].format(
-                        f"https://t.me/{app.username}?start=info_{vidid}",
-                        title[:23],
+                    position = len(db.get(chat_id)) - 1
+                    count += 1
+                    msg += f"{count}. {title[:70]}\n"
+                    msg += f"{_['play_20']} {position}\n\n"
+                else:
+                    if not forceplay:
+                        db[chat_id] = []
+                    status = True if video else None
+                    progress["downloading"] = True
+                    try:
+                        file_path, direct = await YouTube.download(
+                            vidid, mystic, video=status, videoid=True
+                        )
+                    except:
+                        raise AssistantErr(_["play_14"])
+                    await Hotty.join_call(
+                        chat_id,
+                        original_chat_id,
+                        file_path,
+                        video=status,
+                        image=thumbnail,
+                    )
+                    await put_queue(
+                        chat_id,
+                        original_chat_id,
+                        file_path if direct else f"vid_{vidid}",
+                        title,
                         duration_min,
                         user_name,
-                    ),
-                    reply_markup=InlineKeyboardMarkup(button),
-                )
-                db[chat_id][0]["mystic"] = run
-                db[chat_id][0]["markup"] = "stream"
+                        vidid,
+                        user_id,
+                        "video" if video else "audio",
+                        forceplay=forceplay,
+                    )
+                    img = await get_thumb(vidid)
+                    button = stream_markup(_, chat_id)
+                    run = await app.send_photo(
+                        original_chat_id,
+                        photo=img,
+                        caption=_["stream_1"].format(
+                            f"https://t.me/{app.username}?start=info_{vidid}",
+                            title[:23],
+                            duration_min,
+                            user_name,
+                        ),
+                        reply_markup=InlineKeyboardMarkup(button),
+                    )
+                    db[chat_id][0]["mystic"] = run
+                    remember_thumb(vidid, run)
+                    db[chat_id][0]["markup"] = "stream"
+        finally:
+            for task in tasks:
+                task.cancel()
         if count == 0:
             return
         else:
@@ -206,6 +251,7 @@ async def stream(
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            remember_thumb(vidid, run)
             db[chat_id][0]["markup"] = "stream"
     elif streamtype == "soundcloud":
         file_path = result["filepath"]
@@ -374,6 +420,7 @@ async def stream(
                 reply_markup=InlineKeyboardMarkup(button),
             )
             db[chat_id][0]["mystic"] = run
+            remember_thumb(vidid, run)
             db[chat_id][0]["markup"] = "tg"
     elif streamtype == "index":
         link = result
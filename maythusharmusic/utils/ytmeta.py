@@ -0,0 +1,121 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+
+from youtubesearchpython.__future__ import VideosSearch
+
+import config
+from maythusharmusic.core.mongo import mongodb
+from maythusharmusic.logging import LOGGER
+
+ytmetadb = mongodb.ytmeta
+
+VIDEO_ID = re.compile(
+    r"(?:youtube\.com\/(?:watch\?(?:.*&)?v=|embed\/|v\/|shorts\/|live\/)|youtu\.be\/)([0-9A-Za-z_-]{11})"
+)
+
+# key -> (expires_at, value); a key is either a video id or "q:<query>"
+_cache = OrderedDict()
+_pending = {}
+stats = {"hits": 0, "misses": 0, "fetches": 0}
+# Empty results are often transient, they are kept in memory for a minute only.
+NEGATIVE_TTL = 60
+
+
+def normalize(query: str) -> str:
+    query = query.split("&")[0].strip()
+    match = VIDEO_ID.search(query)
+    if match:
+        return match.group(1)
+    return "q:" + " ".join(query.lower().split())
+
+
+def _get(key: str):
+    item = _cache.get(key)
+    if not item:
+        return None
+    expires, value = item
+    if expires < time.time():
+        _cache.pop(key, None)
+        return None
+    _cache.move_to_end(key)
+    return value
+
+
+def _put(key: str, value, ttl: int = None):
+    _cache[key] = (time.time() + (ttl or config.YT_META_CACHE_TTL), value)
+    _cache.move_to_end(key)
+    while len(_cache) > config.YT_META_CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+async def _load(key: str):
+    if not config.YT_META_PERSIST:
+        return None
+    try:
+        doc = await ytmetadb.find_one({"key": key})
+    except Exception as e:
+        LOGGER(__name__).warning(f"Metadata lookup failed for {key}: {e}")
+        return None
+    if not doc or not doc["value"] or doc["ts"] + config.YT_META_CACHE_TTL < time.time():
+        return None
+    return doc["value"]
+
+
+async def _persist(key: str, value):
+    if not config.YT_META_PERSIST:
+        return
+    try:
+        await ytmetadb.update_one(
+            {"key": key},
+            {"$set": {"value": value, "ts": time.time()}},
+            upsert=True,
+        )
+    except Exception as e:
+        LOGGER(__name__).warning(f"Metadata save failed for {key}: {e}")
+
+
+async def _fetch(key: str, query: str, limit: int):
+    value = await _load(key)
+    if value is None:
+        stats["fetches"] += 1
+        results = VideosSearch(query, limit=limit)
+        value = (await results.next()).get("result") or []
+        if not value:
+            _put(key, value, NEGATIVE_TTL)
+            return value
+        await _persist(key, value)
+    for result in value:
+        if result.get("id"):
+            _put(result["id"], [result])
+    _put(key, value)
+    return value
+
+
+async def _search(query: str, limit: int) -> list:
+    key = normalize(query)
+    if limit > 1:
+        key = f"{key}#{limit}"
+    value = _get(key)
+    if value is not None:
+        stats["hits"] += 1
+        return value
+    stats["misses"] += 1
+    task = _pending.get(key)
+    if not task:
+        task = asyncio.ensure_future(_fetch(key, query.split("&")[0], limit))
+        _pending[key] = task
+        task.add_done_callback(lambda _: _pending.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def search_one(query: str) -> dict:
+    results = await _search(query, 1)
+    if not results:
+        raise ValueError(f"No results found for {query}")
+    return results[0]
+
+
+async def search_many(query: str, limit: int = 10) -> list:
+    return await _search(query, limit)
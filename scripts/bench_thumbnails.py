@@ -0,0 +1,139 @@
+"""Thumbnail render micro-benchmark.
+
+Renders the same 480x360 source with the old per-call layer building and
+with workers.thumbs, in a single process. Run from the repository root:
+
+    python3 scripts/bench_thumbnails.py [renders] [jpg|png]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont
+
+sys.path.insert(0, os.getcwd())
+
+from workers.thumbs import (  # noqa: E402
+    changeImageSize,
+    random_color,
+    render_thumb,
+    truncate,
+)
+
+ASSETS = "maythusharmusic/assets/assets"
+
+
+def old_gradient(width, height, start_color, end_color):
+    base = Image.new("RGBA", (width, height), start_color)
+    top = Image.new("RGBA", (width, height), end_color)
+    mask = Image.new("L", (width, height))
+    mask_data = []
+    for y in range(height):
+        mask_data.extend([int(60 * (y / height))] * width)
+    mask.putdata(mask_data)
+    base.paste(top, (0, 0), mask)
+    return base
+
+
+def old_circle(img, output_size, border, border_color, crop_scale=1.5):
+    half_width = img.size[0] / 2
+    half_height = img.size[1] / 2
+    larger_size = int(output_size * crop_scale)
+    img = img.crop(
+        (
+            half_width - larger_size / 2,
+            half_height - larger_size / 2,
+            half_width + larger_size / 2,
+            half_height + larger_size / 2,
+        )
+    )
+    img = img.resize((output_size - 2 * border, output_size - 2 * border))
+    final_img = Image.new("RGBA", (output_size, output_size), border_color)
+    mask_main = Image.new("L", (output_size - 2 * border, output_size - 2 * border), 0)
+    ImageDraw.Draw(mask_main).ellipse(
+        (0, 0, output_size - 2 * border, output_size - 2 * border), fill=255
+    )
+    final_img.paste(img, (border, border), mask_main)
+    mask_border = Image.new("L", (output_size, output_size), 0)
+    ImageDraw.Draw(mask_border).ellipse((0, 0, output_size, output_size), fill=255)
+    return Image.composite(
+        final_img, Image.new("RGBA", final_img.size, (0, 0, 0, 0)), mask_border
+    )
+
+
+def old_shadow(background, draw, position, text, font, fill, shadow_offset=(3, 3), shadow_blur=5):
+    shadow = Image.new("RGBA", background.size, (0, 0, 0, 0))
+    ImageDraw.Draw(shadow).text(position, text, font=font, fill="black")
+    shadow = shadow.filter(ImageFilter.GaussianBlur(radius=shadow_blur))
+    background.paste(shadow, shadow_offset, shadow)
+    draw.text(position, text, font=font, fill=fill)
+
+
+def old_render(image_path, background_path, title, duration, views, channel, quality):
+    youtube = Image.open(image_path)
+    background = changeImageSize(1280, 720, youtube).convert("RGBA")
+    background = background.filter(filter=ImageFilter.BoxBlur(20))
+    background = ImageEnhance.Brightness(background).enhance(0.6)
+    start_color = random_color()
+    gradient = old_gradient(1280, 720, start_color, random_color())
+    background = Image.blend(background, gradient, alpha=0.2)
+    draw = ImageDraw.Draw(background)
+    arial = ImageFont.truetype(f"{ASSETS}/font2.ttf", 30)
+    ImageFont.truetype(f"{ASSETS}/font.ttf", 30)
+    title_font = ImageFont.truetype(f"{ASSETS}/font3.ttf", 45)
+    circle = old_circle(youtube, 400, 20, start_color).resize((400, 400))
+    background.paste(circle, (120, 160), circle)
+    title1 = truncate(title)
+    old_shadow(background, draw, (565, 180), title1[0], title_font, (255, 255, 255))
+    old_shadow(background, draw, (565, 230), title1[1], title_font, (255, 255, 255))
+    old_shadow(background, draw, (565, 320), f"{channel}  |  {views[:23]}", arial, (255, 255, 255))
+    length = int(580 * random.uniform(0.15, 0.85))
+    draw.line([(565, 380), (565 + length, 380)], fill=random_color(), width=9)
+    draw.line([(565 + length, 380), (1145, 380)], fill="white", width=8)
+    old_shadow(background, draw, (565, 400), "00:00", arial, (255, 255, 255))
+    old_shadow(background, draw, (1080, 400), duration, arial, (255, 255, 255))
+    play_icons = Image.open(f"{ASSETS}/play_icons.png").resize((580, 62))
+    background.paste(play_icons, (565, 450), play_icons)
+    os.remove(image_path)
+    if background_path.endswith(".png"):
+        background.save(background_path)
+    else:
+        background.convert("RGB").save(background_path, quality=quality)
+    return background_path
+
+
+def bench(render, renders: int, workdir: str, ext: str) -> float:
+    source = Image.new("RGB", (480, 360))
+    source.putdata([(x % 256, y % 256, (x + y) % 256) for y in range(360) for x in range(480)])
+    start = time.perf_counter()
+    for i in range(renders):
+        image_path = os.path.join(workdir, f"src{i}.png")
+        source.save(image_path)
+        render(
+            image_path,
+            os.path.join(workdir, f"out{i}.{ext}"),
+            "Some Artist Some Fairly Long Song Title Official Video",
+            "3:45",
+            "1.2M views",
+            "Some Channel",
+            85,
+        )
+    return renders / (time.perf_counter() - start)
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    ext = sys.argv[2] if len(sys.argv) > 2 else "jpg"
+    with tempfile.TemporaryDirectory() as workdir:
+        before = bench(old_render, renders, workdir, ext)
+        after = bench(render_thumb, renders, workdir, ext)
+    print(f"{renders} renders of a 480x360 source to {ext}, single process")
+    print(f"before: {before:.2f} renders/s")
+    print(f"after:  {after:.2f} renders/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import multiprocessing
+
+# Modules the worker processes need, they must not import the bot package.
+PRELOAD = ["workers.thumbs", "workers.ytdl"]
+
+
+def context():
+    # Forking the running bot would copy its threads' locks into the workers,
+    # the fork server is started from a clean process instead.
+    ctx = multiprocessing.get_context("forkserver")
+    ctx.set_forkserver_preload(PRELOAD)
+    return ctx
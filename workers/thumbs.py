@@ -0,0 +1,197 @@
+import logging
+import os
+import random
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageFont
+
+
+def changeImageSize(maxWidth, maxHeight, image):
+    widthRatio = maxWidth / image.size[0]
+    heightRatio = maxHeight / image.size[1]
+    newWidth = int(widthRatio * image.size[0])
+    newHeight = int(heightRatio * image.size[1])
+    newImage = image.resize((newWidth, newHeight))
+    return newImage
+
+def truncate(text):
+    list = text.split(" ")
+    text1 = ""
+    text2 = ""    
+    for i in list:
+        if len(text1) + len(i) < 30:        
+            text1 += " " + i
+        elif len(text2) + len(i) < 30:       
+            text2 += " " + i
+
+    text1 = text1.strip()
+    text2 = text2.strip()     
+    return [text1,text2]
+
+def random_color():
+    return (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+
+@lru_cache(maxsize=None)
+def gradient_mask(width, height):
+    return Image.linear_gradient("L").resize((width, height)).point(lambda v: v * 60 // 255)
+
+def generate_gradient(width, height, start_color, end_color):
+    base = Image.new('RGBA', (width, height), start_color)
+    top = Image.new('RGBA', (width, height), end_color)
+    base.paste(top, (0, 0), gradient_mask(width, height))
+    return base
+
+def add_border(image, border_width, border_color):
+    width, height = image.size
+    new_width = width + 2 * border_width
+    new_height = height + 2 * border_width
+    new_image = Image.new("RGBA", (new_width, new_height), border_color)
+    new_image.paste(image, (border_width, border_width))
+    return new_image
+
+def crop_center_circle(img, output_size, border, border_color, crop_scale=1.5):
+    half_the_width = img.size[0] / 2
+    half_the_height = img.size[1] / 2
+    larger_size = int(output_size * crop_scale)
+    img = img.crop(
+        (
+            half_the_width - larger_size/2,
+            half_the_height - larger_size/2,
+            half_the_width + larger_size/2,
+            half_the_height + larger_size/2
+        )
+    )
+    
+    img = img.resize((output_size - 2*border, output_size - 2*border))
+    
+    
+    final_img = Image.new("RGBA", (output_size, output_size), border_color)
+    final_img.paste(img, (border, border), circle_mask(output_size - 2*border))
+    result = Image.composite(final_img, Image.new("RGBA", final_img.size, (0, 0, 0, 0)), circle_mask(output_size))
+    
+    return result
+
+@lru_cache(maxsize=None)
+def circle_mask(size):
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+    return mask
+
+@lru_cache(maxsize=None)
+def load_font(name, size):
+    return ImageFont.truetype(f"maythusharmusic/assets/assets/{name}", size)
+
+def draw_text_with_shadow(background, draw, position, text, font, fill, shadow_offset=(3, 3), shadow_blur=5):
+    if not text:
+        return
+    # Blur only the area around the text instead of a full-frame layer.
+    margin = shadow_blur * 3
+    left, top, right, bottom = draw.textbbox(position, text, font=font)
+    shadow = Image.new('RGBA', (right - left + 2 * margin, bottom - top + 2 * margin), (0, 0, 0, 0))
+    ImageDraw.Draw(shadow).text(
+        (position[0] - left + margin, position[1] - top + margin), text, font=font, fill="black"
+    )
+    shadow = shadow.filter(ImageFilter.GaussianBlur(radius=shadow_blur))
+    background.paste(shadow, (left - margin + shadow_offset[0], top - margin + shadow_offset[1]), shadow)
+    draw.text(position, text, font=font, fill=fill)
+
+@lru_cache(maxsize=None)
+def overlay_template():
+    # Parts of the frame that never change between tracks.
+    template = Image.new("RGBA", (1280, 720), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(template)
+    draw_text_with_shadow(template, draw, (565, 400), "00:00", load_font("font2.ttf", 30), (255, 255, 255))
+    play_icons = Image.open("maythusharmusic/assets/assets/play_icons.png").convert("RGBA")
+    play_icons = play_icons.resize((580, 62))
+    template.paste(play_icons, (565, 450), play_icons)
+    return template
+
+def preload():
+    gradient_mask(1280, 720)
+    circle_mask(360)
+    circle_mask(400)
+    load_font("font2.ttf", 30)
+    load_font("font3.ttf", 45)
+    overlay_template()
+
+def render_thumb(image_path, background_path, title, duration, views, channel, quality):
+    youtube = Image.open(image_path)
+    image1 = changeImageSize(1280, 720, youtube)
+    
+    image2 = image1.convert("RGBA")
+    background = image2.filter(filter=ImageFilter.BoxBlur(20))
+    enhancer = ImageEnhance.Brightness(background)
+    background = enhancer.enhance(0.6)
+
+    
+    start_gradient_color = random_color()
+    end_gradient_color = random_color()
+    gradient_image = generate_gradient(1280, 720, start_gradient_color, end_gradient_color)
+    background = Image.blend(background, gradient_image, alpha=0.2)
+    
+    draw = ImageDraw.Draw(background)
+    arial = load_font("font2.ttf", 30)
+    title_font = load_font("font3.ttf", 45)
+
+
+    circle_thumbnail = crop_center_circle(youtube, 400, 20, start_gradient_color)
+    circle_thumbnail = circle_thumbnail.resize((400, 400))
+    circle_position = (120, 160)
+    background.paste(circle_thumbnail, circle_position, circle_thumbnail)
+
+    text_x_position = 565
+    title1 = truncate(title)
+    draw_text_with_shadow(background, draw, (text_x_position, 180), title1[0], title_font, (255, 255, 255))
+    draw_text_with_shadow(background, draw, (text_x_position, 230), title1[1], title_font, (255, 255, 255))
+    draw_text_with_shadow(background, draw, (text_x_position, 320), f"{channel}  |  {views[:23]}", arial, (255, 255, 255))
+
+
+    line_length = 580  
+    line_color = (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+
+    if duration != "Live":
+        color_line_percentage = random.uniform(0.15, 0.85)
+        color_line_length = int(line_length * color_line_percentage)
+        white_line_length = line_length - color_line_length
+
+        start_point_color = (text_x_position, 380)
+        end_point_color = (text_x_position + color_line_length, 380)
+        draw.line([start_point_color, end_point_color], fill=line_color, width=9)
+    
+        start_point_white = (text_x_position + color_line_length, 380)
+        end_point_white = (text_x_position + line_length, 380)
+        draw.line([start_point_white, end_point_white], fill="white", width=8)
+    
+        circle_radius = 10 
+        circle_position = (end_point_color[0], end_point_color[1])
+        draw.ellipse([circle_position[0] - circle_radius, circle_position[1] - circle_radius,
+                  circle_position[0] + circle_radius, circle_position[1] + circle_radius], fill=line_color)
+    
+    else:
+        line_color = (255, 0, 0)
+        start_point_color = (text_x_position, 380)
+        end_point_color = (text_x_position + line_length, 380)
+        draw.line([start_point_color, end_point_color], fill=line_color, width=9)
+    
+        circle_radius = 10 
+        circle_position = (end_point_color[0], end_point_color[1])
+        draw.ellipse([circle_position[0] - circle_radius, circle_position[1] - circle_radius,
+                      circle_position[0] + circle_radius, circle_position[1] + circle_radius], fill=line_color)
+
+    draw_text_with_shadow(background, draw, (1080, 400), duration, arial, (255, 255, 255))
+    background.alpha_composite(overlay_template())
+
+    os.remove(image_path)
+
+    if background_path.endswith(".png"):
+        background.save(background_path)
+    else:
+        background.convert("RGB").save(background_path, quality=quality)
+    return background_path
+
+
+try:
+    # Loaded once in the fork server, every render worker inherits the layers.
+    preload()
+except Exception as e:
+    logging.error(f"Failed to preload thumbnail assets: {e}")
@@ -0,0 +1,57 @@
+import json
+import os
+from collections import OrderedDict
+
+import yt_dlp
+
+# Lives in each worker process: options -> YoutubeDL kept across calls.
+_instances = OrderedDict()
+MAX_INSTANCES = 8
+
+
+def _ydl(opts: dict) -> yt_dlp.YoutubeDL:
+    key = json.dumps(opts, sort_keys=True)
+    ydl = _instances.get(key)
+    if ydl is None:
+        ydl = _instances[key] = yt_dlp.YoutubeDL(
+            {"socket_timeout": 15, **opts}
+        )
+        if len(_instances) > MAX_INSTANCES:
+            _instances.popitem(last=False)[1].close()
+    _instances.move_to_end(key)
+    return ydl
+
+
+def extract(link: str, opts: dict) -> dict:
+    ydl = _ydl(opts)
+    return ydl.sanitize_info(ydl.extract_info(link, download=False))
+
+
+def stream_url(link: str, opts: dict) -> str:
+    info = _ydl(opts).extract_info(link, download=False)
+    if info.get("url"):
+        return info["url"]
+    return info["requested_formats"][0]["url"]
+
+
+def playlist_ids(link: str, opts: dict) -> list:
+    info = _ydl(opts).extract_info(link, download=False)
+    return [entry["id"] for entry in info.get("entries") or [] if entry]
+
+
+def download(link: str, opts: dict) -> str:
+    ydl = _ydl(opts)
+    info = ydl.extract_info(link, download=False)
+    path = os.path.join("downloads", f"{info['id']}.{info['ext']}")
+    if not os.path.exists(path):
+        # Reuses the extracted info instead of extracting a second time.
+        ydl.process_ie_result(info, download=True)
+    return path
+
+
+def download_only(link: str, opts: dict):
+    _ydl(opts).download([link])
+
+
+def download_info(info: dict, opts: dict):
+    _ydl(opts).process_ie_result(info, download=True)